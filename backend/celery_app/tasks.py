@@ -1,9 +1,11 @@
 """
-Celery tasks for async work: notify on alert, backfill telemetry, trigger retrain.
+Celery tasks for async work: notify on alert (digests per destination, see notify.py), backfill telemetry, trigger retrain.
 Broker: REDIS_URL. Run worker with: celery -A celery_app.tasks worker -l info
 """
 import os
-from celery import Celery
+from datetime import timedelta
+
+from celery import Celery, chord
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 app = Celery("defense", broker=REDIS_URL, backend=REDIS_URL)
@@ -13,17 +15,137 @@ app.conf.accept_content = ["json"]
 
 
 @app.task
-def send_alert_notification(alert_id: str, channel: str = "email") -> str:
-    """Placeholder: send email or webhook for alert. Implement with SMTP or webhook URL from env."""
-    # TODO: load alert from DB, resolve channel (email/webhook), send
-    return f"notified {channel} for {alert_id}"
+def send_alert_notification(alert_id: str, channel: str = "all") -> str:
+    """Queue an alert for every matching destination (channel "email"/"webhook" narrows by type).
+    Delivery happens in flush_notifications, one digest per destination per window."""
+    import asyncio
+    from celery_app import notify
+
+    alerts = asyncio.run(notify.fetch_alerts([alert_id]))
+    if not alerts:
+        return f"notify_unknown_alert {alert_id}"
+    dests = notify.routes_for(alerts[0], notify.load_destinations(), channel)
+    queue = notify.DigestQueue()
+    for d in dests:
+        if queue.enqueue(d["name"], alert_id):
+            flush_notifications.apply_async((d["name"],), countdown=notify.DIGEST_WINDOW_SEC)
+    return f"queued {alert_id} for {len(dests)} destinations"
+
+
+@app.task
+def flush_notifications(dest_name: str, attempt: int = 0) -> str:
+    """Send the queued alerts of one destination as a digest, subject to its rate limit.
+    Transient failures put the alerts back and retry with jittered exponential backoff."""
+    import asyncio
+    from celery_app import notify
+
+    dest = next((d for d in notify.load_destinations() if d["name"] == dest_name), None)
+    if dest is None:
+        return f"notify_unknown_destination {dest_name}"
+    queue = notify.DigestQueue()
+    wait = queue.acquire_send(dest_name, int(dest.get("rate_per_min", notify.DEFAULT_RATE_PER_MIN)))
+    if wait:
+        # This flush still owns the scheduled flag; run again when the rate window ends.
+        flush_notifications.apply_async((dest_name, attempt), countdown=wait)
+        return f"rate_limited {dest_name}"
+    ids, left = queue.take(dest_name, int(dest.get("max_digest", notify.DEFAULT_MAX_DIGEST)))
+    if left and queue.mark_scheduled(dest_name):
+        flush_notifications.apply_async((dest_name,))
+    if not ids:
+        return f"empty {dest_name}"
+    alerts = asyncio.run(notify.fetch_alerts(ids))
+    if not alerts:
+        return f"empty {dest_name}"
+    try:
+        notify.deliver(dest, alerts)
+    except notify.DeliveryError as e:
+        if not e.retryable or attempt + 1 >= notify.MAX_ATTEMPTS:
+            return f"dropped {len(alerts)} for {dest_name}: {e}"
+        queue.requeue(dest_name, ids)
+        if queue.mark_scheduled(dest_name):
+            flush_notifications.apply_async((dest_name, attempt + 1), countdown=notify.backoff_delay(attempt))
+        return f"retrying {dest_name}: {e}"
+    return f"sent {len(alerts)} to {dest_name}"
 
 
 @app.task
 def aggregate_telemetry_bucket(asset_id: str, bucket_ts: str) -> str:
     """Backfill or recompute one aggregation bucket. Used for catch-up or reprocessing."""
-    # TODO: read raw from Kafka or S3, aggregate, write to telemetry.aggregated
-    return f"aggregated {asset_id} {bucket_ts}"
+    from celery_app.backfill import parse_ts
+
+    start = parse_ts(bucket_ts).replace(second=0, microsecond=0)
+    end = start + timedelta(minutes=1)
+    return backfill_telemetry(start.isoformat(), end.isoformat(), [asset_id], window_minutes=1)
+
+
+@app.task
+def backfill_telemetry(
+    from_ts: str,
+    to_ts: str,
+    asset_ids: list[str] | None = None,
+    window_minutes: int = 60,
+    job_id: str | None = None,
+) -> str:
+    """Rebuild telemetry.aggregated for [from_ts, to_ts) from telemetry.raw as a chord of shard tasks.
+    Pass job_id of an interrupted job to resume it; only unfinished shards are re-dispatched."""
+    import asyncio
+    from celery_app import backfill
+
+    if job_id:
+        job, shards = asyncio.run(backfill.load_job(job_id))
+        if job is None:
+            return f"backfill_unknown_job {job_id}"
+        asset_ids = [str(a) for a in job["asset_ids"]] if job["asset_ids"] else None
+    else:
+        start, end = backfill.parse_ts(from_ts), backfill.parse_ts(to_ts)
+        partitions = backfill.topic_partitions()
+        backfill.check_range(end, partitions)
+        expired = backfill.unretained_partitions(start, partitions)
+        if expired:
+            raise ValueError(f"range start is past Kafka retention on partitions {expired}; refusing to rebuild")
+        shards = backfill.plan_shards(start, end, partitions, window_minutes)
+        job_id = asyncio.run(backfill.create_job(start, end, asset_ids, window_minutes, shards))
+    if not shards:
+        finish_backfill.delay([], job_id)
+        return job_id
+    chord(
+        backfill_telemetry_shard.s(job_id, p, ws.isoformat(), we.isoformat(), asset_ids)
+        for p, ws, we in shards
+    )(finish_backfill.s(job_id))
+    return job_id
+
+
+@app.task(acks_late=True, autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def backfill_telemetry_shard(
+    job_id: str,
+    partition: int,
+    window_start: str,
+    window_end: str,
+    asset_ids: list[str] | None = None,
+) -> dict:
+    """Replay one (partition, window) shard and commit its buckets; idempotent per shard."""
+    from celery_app import backfill
+
+    return backfill.run_shard(job_id, partition, backfill.parse_ts(window_start), backfill.parse_ts(window_end), asset_ids)
+
+
+@app.task
+def finish_backfill(results: list[dict], job_id: str) -> dict:
+    """Chord callback: mark the job done (if every shard is) and return progress and throughput."""
+    import asyncio
+    from celery_app import backfill
+
+    asyncio.run(backfill.finish_job(job_id))
+    return backfill_progress(job_id)
+
+
+@app.task
+def backfill_progress(job_id: str) -> dict:
+    """Shards done/total, events and buckets written, and events/sec for a backfill job."""
+    import asyncio
+    from celery_app import backfill
+
+    return asyncio.run(backfill.job_progress(job_id)) or {"job_id": job_id, "status": "unknown"}
 
 
 @app.task
@@ -0,0 +1,14 @@
+-- Composite indexes backing keyset (cursor) pagination on list endpoints.
+-- Sort keys: telemetry (bucket_ts, id), alerts and audit (created_at, id), all DESC.
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_bucket_ts_id ON telemetry.aggregated(bucket_ts DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_telemetry_asset_bucket_ts_id ON telemetry.aggregated(asset_id, bucket_ts DESC, id DESC);
+DROP INDEX IF EXISTS telemetry.idx_telemetry_bucket_ts;
+
+CREATE INDEX IF NOT EXISTS idx_alerts_created_id ON alerts.alerts(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_region_created_id ON alerts.alerts(region_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS alerts.idx_alerts_created;
+
+CREATE INDEX IF NOT EXISTS idx_audit_created_id ON audit.command_log(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_asset_created_id ON audit.command_log(asset_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS audit.idx_audit_created;
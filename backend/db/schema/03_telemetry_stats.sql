@@ -0,0 +1,63 @@
+-- Per-bucket numeric statistics for telemetry.aggregated.
+-- One row per (asset_id, bucket_ts, source); stats = {field: {n, min, max, mean, std}}.
+
+ALTER TABLE telemetry.aggregated ADD COLUMN IF NOT EXISTS stats JSONB NOT NULL DEFAULT '{}';
+
+-- Collapse legacy one-row-per-event rows so the bucket key can be unique.
+CREATE TEMP TABLE _bucket_keep AS
+SELECT asset_id, bucket_ts, source, MIN(id) AS keep_id, SUM(count_events) AS total
+FROM telemetry.aggregated
+GROUP BY asset_id, bucket_ts, source
+HAVING COUNT(*) > 1;
+
+UPDATE telemetry.aggregated t SET count_events = k.total
+FROM _bucket_keep k WHERE t.id = k.keep_id;
+
+DELETE FROM telemetry.aggregated t USING _bucket_keep k
+WHERE t.asset_id = k.asset_id AND t.bucket_ts = k.bucket_ts AND t.source = k.source AND t.id <> k.keep_id;
+
+DROP TABLE _bucket_keep;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_telemetry_bucket ON telemetry.aggregated(asset_id, bucket_ts, source);
+
+-- Merge two stats documents (parallel mean/variance combination), used when a bucket is flushed twice.
+CREATE OR REPLACE FUNCTION telemetry.merge_stats(a JSONB, b JSONB) RETURNS JSONB AS $$
+DECLARE
+    out JSONB := COALESCE(a, '{}'::jsonb);
+    k TEXT;
+    sa JSONB;
+    sb JSONB;
+    na DOUBLE PRECISION;
+    nb DOUBLE PRECISION;
+    n DOUBLE PRECISION;
+    delta DOUBLE PRECISION;
+    m2 DOUBLE PRECISION;
+BEGIN
+    IF b IS NULL THEN
+        RETURN out;
+    END IF;
+    FOR k, sb IN SELECT key, value FROM jsonb_each(b) LOOP
+        sa := out -> k;
+        IF sa IS NULL THEN
+            out := out || jsonb_build_object(k, sb);
+            CONTINUE;
+        END IF;
+        na := (sa ->> 'n')::float8;
+        nb := (sb ->> 'n')::float8;
+        n := na + nb;
+        IF n = 0 THEN
+            CONTINUE;
+        END IF;
+        delta := (sb ->> 'mean')::float8 - (sa ->> 'mean')::float8;
+        m2 := power((sa ->> 'std')::float8, 2) * na + power((sb ->> 'std')::float8, 2) * nb + delta * delta * na * nb / n;
+        out := out || jsonb_build_object(k, jsonb_build_object(
+            'n', n::bigint,
+            'min', LEAST((sa ->> 'min')::float8, (sb ->> 'min')::float8),
+            'max', GREATEST((sa ->> 'max')::float8, (sb ->> 'max')::float8),
+            'mean', (sa ->> 'mean')::float8 + delta * nb / n,
+            'std', sqrt(m2 / n)
+        ));
+    END LOOP;
+    RETURN out;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
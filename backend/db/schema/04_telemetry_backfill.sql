@@ -0,0 +1,37 @@
+-- Telemetry backfill jobs: one row per job, one row per shard (time window x Kafka partition).
+-- A shard's buckets and its 'done' marker commit together, so a resumed job skips finished shards.
+
+CREATE TABLE IF NOT EXISTS telemetry.backfill_jobs (
+    id UUID PRIMARY KEY,
+    from_ts TIMESTAMPTZ NOT NULL,
+    to_ts TIMESTAMPTZ NOT NULL,
+    asset_ids UUID[],
+    window_minutes INT NOT NULL,
+    shards_total INT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'running',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS telemetry.backfill_shards (
+    job_id UUID NOT NULL REFERENCES telemetry.backfill_jobs(id) ON DELETE CASCADE,
+    partition INT NOT NULL,
+    window_start TIMESTAMPTZ NOT NULL,
+    window_end TIMESTAMPTZ NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    events BIGINT NOT NULL DEFAULT 0,
+    buckets INT NOT NULL DEFAULT 0,
+    elapsed_ms INT NOT NULL DEFAULT 0,
+    finished_at TIMESTAMPTZ,
+    PRIMARY KEY (job_id, partition, window_start)
+);
+
+-- (window, asset) pairs a job has already cleared. The first shard that replays an asset's data for a
+-- window replaces its old buckets; shards of other partitions holding the same asset merge into them.
+-- Nothing is deleted for windows or assets the replay did not see.
+CREATE TABLE IF NOT EXISTS telemetry.backfill_cleared (
+    job_id UUID NOT NULL REFERENCES telemetry.backfill_jobs(id) ON DELETE CASCADE,
+    window_start TIMESTAMPTZ NOT NULL,
+    asset_id UUID NOT NULL,
+    PRIMARY KEY (job_id, window_start, asset_id)
+);
@@ -0,0 +1,31 @@
+-- Push alert changes to listeners (alert service /alerts/stream) instead of clients polling GET /alerts.
+-- One NOTIFY per inserted or changed alert on channel 'alerts_changed'. The payload is a compact
+-- summary (no body/metadata) so it stays far below the 8000-byte NOTIFY limit.
+
+CREATE OR REPLACE FUNCTION alerts.notify_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('alerts_changed', json_build_object(
+        'op', lower(TG_OP),
+        'id', NEW.id,
+        'source', NEW.source,
+        'severity', NEW.severity,
+        'title', NEW.title,
+        'asset_id', NEW.asset_id,
+        'region_id', NEW.region_id,
+        'detection_id', NEW.detection_id,
+        'state', NEW.state,
+        'hit_count', CASE WHEN jsonb_typeof(NEW.metadata->'hit_count') = 'number'
+                          THEN (NEW.metadata->>'hit_count')::numeric::bigint ELSE 1 END,
+        'last_seen', NEW.metadata->>'last_seen',
+        'created_at', NEW.created_at,
+        'updated_at', NEW.updated_at
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_alerts_notify ON alerts.alerts;
+CREATE TRIGGER trg_alerts_notify
+AFTER INSERT OR UPDATE ON alerts.alerts
+FOR EACH ROW EXECUTE FUNCTION alerts.notify_change();
@@ -0,0 +1,56 @@
+-- Alert counters by (severity, state, region) for GET /alerts/summary, kept current by statement-level
+-- triggers: each INSERT/UPDATE/DELETE statement (including a COPY batch) applies one grouped delta per
+-- affected key from its transition tables, instead of one counter write per row.
+-- region_id '' stands for alerts without a region.
+
+CREATE TABLE IF NOT EXISTS alerts.alert_counts (
+    severity VARCHAR(32) NOT NULL,
+    state VARCHAR(32) NOT NULL,
+    region_id VARCHAR(128) NOT NULL DEFAULT '',
+    n BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (severity, state, region_id)
+);
+
+CREATE OR REPLACE FUNCTION alerts.apply_count_deltas() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO alerts.alert_counts AS c (severity, state, region_id, n)
+        SELECT severity, state, COALESCE(region_id, ''), COUNT(*) FROM new_rows GROUP BY 1, 2, 3
+        ON CONFLICT (severity, state, region_id) DO UPDATE SET n = c.n + EXCLUDED.n;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO alerts.alert_counts AS c (severity, state, region_id, n)
+        SELECT severity, state, COALESCE(region_id, ''), -COUNT(*) FROM old_rows GROUP BY 1, 2, 3
+        ON CONFLICT (severity, state, region_id) DO UPDATE SET n = c.n + EXCLUDED.n;
+    ELSE
+        -- Updates that do not touch severity/state/region net to zero and write nothing.
+        INSERT INTO alerts.alert_counts AS c (severity, state, region_id, n)
+        SELECT severity, state, region_id, SUM(d) FROM (
+            SELECT severity, state, COALESCE(region_id, '') AS region_id, 1 AS d FROM new_rows
+            UNION ALL
+            SELECT severity, state, COALESCE(region_id, ''), -1 FROM old_rows
+        ) x
+        GROUP BY 1, 2, 3
+        HAVING SUM(d) <> 0
+        ON CONFLICT (severity, state, region_id) DO UPDATE SET n = c.n + EXCLUDED.n;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+BEGIN;
+LOCK TABLE alerts.alerts IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM alerts.alert_counts;
+INSERT INTO alerts.alert_counts (severity, state, region_id, n)
+SELECT severity, state, COALESCE(region_id, ''), COUNT(*) FROM alerts.alerts GROUP BY 1, 2, 3;
+
+DROP TRIGGER IF EXISTS trg_alert_counts_ins ON alerts.alerts;
+DROP TRIGGER IF EXISTS trg_alert_counts_upd ON alerts.alerts;
+DROP TRIGGER IF EXISTS trg_alert_counts_del ON alerts.alerts;
+CREATE TRIGGER trg_alert_counts_ins AFTER INSERT ON alerts.alerts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION alerts.apply_count_deltas();
+CREATE TRIGGER trg_alert_counts_upd AFTER UPDATE ON alerts.alerts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION alerts.apply_count_deltas();
+CREATE TRIGGER trg_alert_counts_del AFTER DELETE ON alerts.alerts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION alerts.apply_count_deltas();
+COMMIT;
@@ -0,0 +1,15 @@
+-- Tell in-process asset caches (alert consumer enrichment) which asset changed.
+-- Fires only on the columns those caches hold, so frequent status updates do not invalidate them.
+
+CREATE OR REPLACE FUNCTION assets.notify_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('assets_changed', COALESCE(NEW.id, OLD.id)::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_assets_notify ON assets.assets;
+CREATE TRIGGER trg_assets_notify
+AFTER INSERT OR DELETE OR UPDATE OF name, asset_type, region_id ON assets.assets
+FOR EACH ROW EXECUTE FUNCTION assets.notify_change();
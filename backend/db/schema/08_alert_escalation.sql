@@ -0,0 +1,4 @@
+-- Alerts still waiting for acknowledgement, oldest first. The alert service's escalation scheduler
+-- rebuilds its pending deadlines from this index on start and after losing its LISTEN connection.
+
+CREATE INDEX IF NOT EXISTS idx_alerts_new_created ON alerts.alerts(created_at) WHERE state = 'new';
@@ -0,0 +1,133 @@
+"""
+Fan-out of alert change notifications to stream subscribers.
+One dedicated Postgres connection LISTENs on 'alerts_changed' (trigger in db/schema/05_alert_notify.sql)
+for the whole process; each notification is filtered per subscriber by region and severity and put
+on that subscriber's bounded queue. A subscriber that falls QUEUE_SIZE events behind is closed so the
+client reconnects and re-syncs with GET /alerts instead of stalling everyone else.
+In-process consumers (the escalation scheduler) register with add_handler and add_connect_hook; the
+connect hooks run after every (re)connect so they can re-sync anything missed while disconnected.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+import asyncpg
+
+CHANNEL = "alerts_changed"
+QUEUE_SIZE = 256
+RECONNECT_DELAY_SEC = 2.0
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put on a subscriber's queue when it is dropped for being too slow.
+CLOSED = None
+
+
+class Subscriber:
+    def __init__(self, regions: list[str] | None, severities: set[str] | None) -> None:
+        self.regions = None if regions is None else set(regions)
+        self.severities = severities
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+    def wants(self, event: dict[str, Any]) -> bool:
+        if self.severities is not None and event.get("severity") not in self.severities:
+            return False
+        return self.regions is None or event.get("region_id") in self.regions
+
+
+class AlertBroadcaster:
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self.subscribers: set[Subscriber] = set()
+        self.notifications = 0
+        self.slow_drops = 0
+        self._handlers: list[Callable[[dict[str, Any]], None]] = []
+        self._connect_hooks: list[Callable[[], Awaitable[None]]] = []
+        self._conn: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def add_handler(self, handler: Callable[[dict[str, Any]], None]) -> None:
+        self._handlers.append(handler)
+
+    def add_connect_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        self._connect_hooks.append(hook)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    def subscribe(self, regions: list[str] | None, severities: set[str] | None) -> Subscriber:
+        sub = Subscriber(regions, severities)
+        self.subscribers.add(sub)
+        self.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+
+    def publish(self, event: dict[str, Any]) -> None:
+        self.notifications += 1
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.warning("alert change handler error: %s", e)
+        for sub in list(self.subscribers):
+            if not sub.wants(event):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.slow_drops += 1
+                self._drop(sub)
+
+    def _drop(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+        sub.dropped = True
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(CLOSED)
+
+    def _on_notify(self, conn, pid, channel, payload: str) -> None:
+        try:
+            self.publish(json.loads(payload))
+        except ValueError:
+            logger.warning("bad alert notification payload")
+
+    async def _listen(self) -> None:
+        """Hold the LISTEN connection; reconnect after failures until close()."""
+        while not self._closing:
+            try:
+                self._conn = await asyncpg.connect(self.dsn)
+                await self._conn.add_listener(CHANNEL, self._on_notify)
+                lost = asyncio.Event()
+                self._conn.add_termination_listener(lambda conn: lost.set())
+                for hook in self._connect_hooks:
+                    await hook()
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("alert listener error: %s", e)
+            finally:
+                if self._conn is not None and not self._conn.is_closed():
+                    await self._conn.close()
+                self._conn = None
+            if not self._closing:
+                await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for sub in list(self.subscribers):
+            self._drop(sub)
@@ -0,0 +1,123 @@
+"""
+In-process asset metadata cache (name, type, region) for enriching detections before alert rules run.
+Preloaded with one bulk query at startup; misses for a whole batch are fetched with one query, and
+unknown ids are cached as negative entries so a bad asset_id does not hit the DB on every frame.
+Entries expire after ttl_seconds; assets_changed notifications (db/schema/07_asset_notify.sql) drop
+single entries as soon as the listening connection is serviced by the event loop.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any
+
+import asyncpg
+
+ASSET_FIELDS = ("name", "asset_type", "region_id")
+CHANNEL = "assets_changed"
+
+
+def _asset_uuid(value: Any) -> uuid.UUID | None:
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+class AssetCache:
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 100000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # asset id -> (fields or None for "no such asset", loaded at monotonic time)
+        self._entries: OrderedDict[uuid.UUID, tuple[dict[str, Any] | None, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listener: asyncpg.Connection | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _put(self, asset_id: uuid.UUID, fields: dict[str, Any] | None, now: float) -> None:
+        self._entries[asset_id] = (fields, now)
+        self._entries.move_to_end(asset_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, asset_id: Any) -> None:
+        key = _asset_uuid(asset_id)
+        if key is not None and self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def preload(self, db: asyncpg.Pool) -> int:
+        rows = await db.fetch(
+            f"SELECT id, {', '.join(ASSET_FIELDS)} FROM assets.assets ORDER BY updated_at DESC LIMIT $1",
+            self.max_entries,
+        )
+        now = time.monotonic()
+        for r in reversed(rows):
+            self._put(r["id"], {f: r[f] for f in ASSET_FIELDS}, now)
+        return len(rows)
+
+    async def listen(self, dsn: str) -> None:
+        """LISTEN for asset changes on a dedicated connection; TTL expiry still covers missed ones."""
+        self._listener = await asyncpg.connect(dsn)
+        await self._listener.add_listener(CHANNEL, lambda conn, pid, channel, payload: self.invalidate(payload))
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    async def get_many(self, db: asyncpg.Pool, asset_ids: list[Any]) -> dict[uuid.UUID, dict[str, Any]]:
+        """Metadata for the given ids (unknown ids omitted); all misses come from one query."""
+        now = time.monotonic()
+        found: dict[uuid.UUID, dict[str, Any]] = {}
+        missing: set[uuid.UUID] = set()
+        for raw in asset_ids:
+            key = _asset_uuid(raw)
+            if key is None or key in found or key in missing:
+                continue
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                if entry[0] is not None:
+                    found[key] = entry[0]
+            else:
+                self.misses += 1
+                missing.add(key)
+        if missing:
+            rows = await db.fetch(
+                f"SELECT id, {', '.join(ASSET_FIELDS)} FROM assets.assets WHERE id = ANY($1::uuid[])",
+                list(missing),
+            )
+            for r in rows:
+                fields = {f: r[f] for f in ASSET_FIELDS}
+                self._put(r["id"], fields, now)
+                found[r["id"]] = fields
+                missing.discard(r["id"])
+            for key in missing:
+                self._put(key, None, now)
+        return found
+
+    async def enrich(self, db: asyncpg.Pool, detections: list[dict]) -> int:
+        """Fill region_id, asset_type and asset_name on detections from the cache. Values the detection
+        carries win; a null counts as missing, so an explicit "region_id": null is still routed."""
+        assets = await self.get_many(db, [d.get("asset_id") for d in detections])
+        enriched = 0
+        for d in detections:
+            meta = assets.get(_asset_uuid(d.get("asset_id")))
+            if meta is None:
+                continue
+            for field, value in (("region_id", meta["region_id"]), ("asset_type", meta["asset_type"]),
+                                 ("asset_name", meta["name"])):
+                if d.get(field) is None:
+                    d[field] = value
+            enriched += 1
+        return enriched
@@ -0,0 +1,176 @@
+"""
+Automatic escalation of alerts nobody acknowledged in time.
+Each alert still in state 'new' has a deadline of created_at plus the delay for its severity
+(ALERT_ESCALATE_AFTER_SEC); deadlines sit in a min-heap keyed by alert id, so the scheduler sleeps
+until the earliest one instead of scanning the table. Alert changes arrive from the alerts_changed
+feed (alert_stream.AlertBroadcaster): a new alert is scheduled, any other state cancels it. Due alerts
+are escalated with one UPDATE per batch; only ids that UPDATE actually changed are passed on for
+notification, so several alert service replicas never notify twice. On start and after every
+reconnect of the feed, pending deadlines are rebuilt with one query on idx_alerts_new_created
+(db/schema/08_alert_escalation.sql).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+import asyncpg
+
+from defense_shared.schemas import AlertState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ESCALATE_AFTER_SEC = {"critical": 120.0, "high": 300.0, "medium": 900.0, "low": 3600.0}
+BATCH_SIZE = 1000
+RETRY_DELAY_SEC = 5.0
+
+Notify = Callable[[list[str]], Awaitable[None]]
+
+
+def _epoch(value: Any) -> float | None:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class EscalationScheduler:
+    def __init__(self, escalate_after: dict[str, float], batch_size: int = BATCH_SIZE) -> None:
+        # Severities missing from escalate_after (e.g. info) are never escalated.
+        self.escalate_after = {k: float(v) for k, v in escalate_after.items() if v and float(v) > 0}
+        self.batch_size = batch_size
+        self._heap: list[tuple[float, str]] = []
+        # alert id -> its live deadline; heap entries that disagree were cancelled or rescheduled.
+        self._deadlines: dict[str, float] = {}
+        self._wake = asyncio.Event()
+        self.escalated = 0
+        self.notify_errors = 0
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, alert_id: str, severity: str, created_at: Any) -> bool:
+        after = self.escalate_after.get(severity)
+        created = _epoch(created_at)
+        if after is None or created is None:
+            return False
+        self._push(str(alert_id), created + after)
+        return True
+
+    def _push(self, alert_id: str, deadline: float) -> None:
+        if self._deadlines.get(alert_id) == deadline:
+            return
+        self._deadlines[alert_id] = deadline
+        if not self._heap or deadline < self._heap[0][0]:
+            self._wake.set()
+        heapq.heappush(self._heap, (deadline, alert_id))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(d, a) for a, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, alert_id: str) -> bool:
+        return self._deadlines.pop(str(alert_id), None) is not None
+
+    def on_change(self, event: dict[str, Any]) -> None:
+        """Handler for alerts_changed events."""
+        alert_id = event.get("id")
+        if not alert_id:
+            return
+        if event.get("state") == AlertState.NEW.value:
+            self.schedule(alert_id, event.get("severity"), event.get("created_at"))
+        else:
+            self.cancel(alert_id)
+
+    def next_deadline(self) -> float | None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int | None = None) -> list[str]:
+        due: list[str] = []
+        while self._heap and (limit is None or len(due) < limit):
+            deadline, alert_id = self._heap[0]
+            if self._deadlines.get(alert_id) != deadline:
+                heapq.heappop(self._heap)
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            del self._deadlines[alert_id]
+            due.append(alert_id)
+        return due
+
+    async def rebuild(self, db: asyncpg.Pool) -> int:
+        """Schedule every 'new' alert of an escalating severity. Merged into, not replacing, what is pending:
+        an alert notified while the query runs stays scheduled, and entries whose alert changed meanwhile
+        are harmless because escalate() only touches alerts that are still new."""
+        # Literal 'new' (not a parameter) so even a generic plan can use the partial index
+        # idx_alerts_new_created (08_alert_escalation.sql).
+        rows = await db.fetch(
+            "SELECT id, severity, created_at FROM alerts.alerts WHERE state = 'new' AND severity = ANY($1::varchar[])",
+            list(self.escalate_after),
+        )
+        for r in rows:
+            self._deadlines[str(r["id"])] = r["created_at"].timestamp() + self.escalate_after[r["severity"]]
+        self._heap = [(d, a) for a, d in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self.rebuilds += 1
+        self._wake.set()
+        return len(rows)
+
+    async def escalate(self, db: asyncpg.Pool, alert_ids: list[str], notify: Notify | None = None) -> list[str]:
+        """Move still-new alerts to escalated in one statement; returns the ids this call changed."""
+        rows = await db.fetch(
+            """
+            UPDATE alerts.alerts SET state = $1, updated_at = NOW()
+            WHERE id = ANY($2::uuid[]) AND state = $3
+            RETURNING id
+            """,
+            AlertState.ESCALATED.value,
+            alert_ids,
+            AlertState.NEW.value,
+        )
+        changed = [str(r["id"]) for r in rows]
+        self.escalated += len(changed)
+        if changed and notify is not None:
+            try:
+                await notify(changed)
+            except Exception as e:
+                self.notify_errors += 1
+                logger.warning("escalation notification error: %s", e)
+        return changed
+
+    async def run(self, db: asyncpg.Pool, notify: Notify | None = None) -> None:
+        """Sleep until the earliest deadline (or an earlier one is scheduled), then escalate what is due."""
+        while True:
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            while True:
+                due = self.pop_due(time.time(), self.batch_size)
+                if not due:
+                    break
+                try:
+                    await self.escalate(db, due, notify)
+                except Exception as e:
+                    logger.warning("escalation error, retrying in %ss: %s", RETRY_DELAY_SEC, e)
+                    retry_at = time.time() + RETRY_DELAY_SEC
+                    for alert_id in due:
+                        self._push(alert_id, retry_at)
+                    break
@@ -0,0 +1,281 @@
+"""
+Declarative alert rules, compiled to NumPy predicates and evaluated over a whole detection batch.
+Rules are loaded from a JSON file (ALERT_RULES_PATH, see alert_rules.example.json) and re-read when
+its mtime changes; a file that fails to load leaves the previous rules in place. Rules are tried in
+file order and the first match decides severity and title. Detections matching no rule raise no alert.
+
+Rule fields (all "match" keys optional, all given keys must hold):
+    name, severity, title          title is a str.format template over detection fields plus
+                                   confidence, rule and severity; unknown names render as "unknown"
+    match.class_name               list of class names
+    match.region_id                list of region ids (detection must carry region_id)
+    match.asset_type               list of asset types (detection must carry asset_type)
+    match.hours_utc                [start, end) hour of day, wrapping past midnight when start > end
+    match.confidence               {"min": float, "max": float}, on threat_score or confidence
+    match.count_in_window          {"min": int, "window_sec": float}, hits of the same
+                                   (asset_id, class_name) within the window, this one included
+"""
+from __future__ import annotations
+
+import json
+import os
+import string
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+from defense_shared.schemas import AlertSeverity
+
+SEVERITIES = tuple(s.value for s in AlertSeverity)
+MAX_RULES = 5000
+MAX_COUNT_KEYS = 50000
+
+
+def default_rules(threshold: float) -> list[dict]:
+    """The behaviour before rules existed: high at >= 0.8, medium at >= threshold."""
+    title = "Threat detected: {class_name}"
+    return [
+        {"name": "high-threat", "match": {"confidence": {"min": max(0.8, threshold)}}, "severity": "high", "title": title},
+        {"name": "threat", "match": {"confidence": {"min": threshold}}, "severity": "medium", "title": title},
+    ]
+
+
+class _Vocab:
+    """String -> small int codes so set membership becomes a boolean table lookup over int arrays."""
+
+    def __init__(self) -> None:
+        self.codes: dict[str, int] = {}
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        return self.codes.setdefault(str(value), len(self.codes))
+
+
+class _Defaults(dict):
+    def __missing__(self, key: str) -> str:
+        return "unknown"
+
+
+class _WindowCounter:
+    """Recent hit times per (asset_id, class_name), bounded in keys and in age."""
+
+    def __init__(self, horizon_sec: float, max_keys: int = MAX_COUNT_KEYS) -> None:
+        self.horizon_sec = horizon_sec
+        self.max_keys = max_keys
+        self._hits: OrderedDict[tuple[str, str], deque] = OrderedDict()
+
+    def add(self, key: tuple[str, str], ts: float) -> deque:
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        hits.append(ts)
+        while hits and hits[0] <= ts - self.horizon_sec:
+            hits.popleft()
+        return hits
+
+
+def _hours_mask(hours: np.ndarray, start: int, end: int) -> np.ndarray:
+    if start <= end:
+        return (hours >= start) & (hours < end)
+    return (hours >= start) | (hours < end)
+
+
+class CompiledRules:
+    def __init__(self, rules: list[dict]) -> None:
+        if not isinstance(rules, list) or len(rules) > MAX_RULES:
+            raise ValueError(f"rules must be a list of at most {MAX_RULES} entries")
+        self.vocab = {"class_name": _Vocab(), "region_id": _Vocab(), "asset_type": _Vocab()}
+        self.rules = [self._compile(i, r) for i, r in enumerate(rules)]
+        # Membership as a boolean lookup table indexed by code + 2 (code -2: value no rule names).
+        for rule in self.rules:
+            for field, codes in rule["sets"].items():
+                lut = np.zeros(len(self.vocab[field].codes) + 2, dtype=bool)
+                lut[codes + 2] = True
+                rule["sets"][field] = lut
+        self.windows = sorted({c["window_sec"] for c in self.rules if c["count_min"] is not None})
+        self._counter = _WindowCounter(max(self.windows)) if self.windows else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def carry_counts(self, old: "CompiledRules") -> None:
+        """Continue counting from old's hit history, so a reload does not restart count-in-window rules."""
+        if self._counter is not None and old._counter is not None:
+            old._counter.horizon_sec = self._counter.horizon_sec
+            self._counter = old._counter
+
+    def _compile(self, i: int, rule: dict) -> dict:
+        if not isinstance(rule, dict):
+            raise ValueError(f"rule {i}: must be an object")
+        severity = rule.get("severity", "medium")
+        if severity not in SEVERITIES:
+            raise ValueError(f"rule {i}: severity must be one of {SEVERITIES}")
+        title = str(rule.get("title", "Threat detected: {class_name}"))
+        for _, field, spec, _ in string.Formatter().parse(title):
+            if field is not None and not field.isidentifier():
+                raise ValueError(f"rule {i}: title may only reference plain field names")
+        match = rule.get("match") or {}
+        compiled = {
+            "name": str(rule.get("name", f"rule-{i}")),
+            "severity": severity,
+            "title": title,
+            "sets": {},
+            "hours": None,
+            "conf": (float("-inf"), float("inf")),
+            "count_min": None,
+            "window_sec": None,
+        }
+        for field, vocab in self.vocab.items():
+            if field in match:
+                values = match[field] if isinstance(match[field], list) else [match[field]]
+                compiled["sets"][field] = np.array([vocab.code(v) for v in values], dtype=np.int64)
+        if "hours_utc" in match:
+            start, end = (int(h) for h in match["hours_utc"])
+            if not (0 <= start <= 24 and 0 <= end <= 24):
+                raise ValueError(f"rule {i}: hours_utc must be within 0..24")
+            compiled["hours"] = (start, end)
+        if "confidence" in match:
+            conf = match["confidence"]
+            compiled["conf"] = (float(conf.get("min", float("-inf"))), float(conf.get("max", float("inf"))))
+        if "count_in_window" in match:
+            cw = match["count_in_window"]
+            compiled["count_min"] = int(cw.get("min", 1))
+            compiled["window_sec"] = float(cw["window_sec"])
+            if compiled["window_sec"] <= 0:
+                raise ValueError(f"rule {i}: count_in_window.window_sec must be > 0")
+        return compiled
+
+    def _columns(self, detections: list[dict], now: float) -> dict[str, np.ndarray]:
+        n = len(detections)
+        cols = {
+            field: np.fromiter((vocab.codes.get(str(d.get(field)), -2) for d in detections), np.int64, n) + 2
+            for field, vocab in self.vocab.items()
+        }
+        times = np.fromiter((_event_time(d, now) for d in detections), np.float64, n)
+        cols["hour"] = ((times % 86400) // 3600).astype(np.int64)
+        cols["confidence"] = np.fromiter((_score(d) for d in detections), np.float64, n)
+        if self._counter is not None:
+            for w in self.windows:
+                cols[f"count_{w}"] = np.zeros(n, dtype=np.int64)
+            for j, d in enumerate(detections):
+                hits = self._counter.add((str(d.get("asset_id")), str(d.get("class_name"))), times[j])
+                for w in self.windows:
+                    # Hits are in arrival order, so count back from the newest.
+                    c = 0
+                    for t in reversed(hits):
+                        if t <= times[j] - w:
+                            break
+                        c += 1
+                    cols[f"count_{w}"][j] = c
+        return cols
+
+    def evaluate(self, detections: list[dict], now: float | None = None) -> list[tuple[str, str, str] | None]:
+        """(rule name, severity, title) of the first matching rule per detection, or None."""
+        if not detections:
+            return []
+        now = time.time() if now is None else now
+        cols = self._columns(detections, now)
+        n = len(detections)
+        chosen = np.full(n, -1, dtype=np.int64)
+        for r, rule in enumerate(self.rules):
+            mask = chosen == -1
+            if not mask.any():
+                break
+            lo, hi = rule["conf"]
+            mask &= (cols["confidence"] >= lo) & (cols["confidence"] <= hi)
+            for field, lut in rule["sets"].items():
+                mask &= lut[cols[field]]
+            if rule["hours"] is not None:
+                mask &= _hours_mask(cols["hour"], *rule["hours"])
+            if rule["count_min"] is not None:
+                mask &= cols[f"count_{rule['window_sec']}"] >= rule["count_min"]
+            chosen[mask] = r
+        out: list[tuple[str, str, str] | None] = []
+        for j, r in enumerate(chosen.tolist()):
+            if r < 0:
+                out.append(None)
+                continue
+            rule = self.rules[r]
+            fields = _Defaults({k: v for k, v in detections[j].items() if isinstance(v, (str, int, float))})
+            fields.update(confidence=float(cols["confidence"][j]), rule=rule["name"], severity=rule["severity"])
+            try:
+                title = rule["title"].format_map(fields)
+            except (ValueError, TypeError):
+                title = rule["title"]
+            out.append((rule["name"], rule["severity"], title[:512]))
+        return out
+
+
+def _score(d: dict) -> float:
+    try:
+        return float(d.get("threat_score") or d.get("confidence", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _event_time(d: dict, now: float) -> float:
+    ts = d.get("timestamp")
+    if isinstance(ts, str):
+        try:
+            parsed = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        except ValueError:
+            return now
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return now
+
+
+class RuleEngine:
+    """Holds the compiled rule set and reloads it when the rules file changes."""
+
+    def __init__(self, path: str | None, threshold: float, check_interval_sec: float = 5.0) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.check_interval_sec = check_interval_sec
+        self.reloads = 0
+        self.reload_errors = 0
+        self._mtime: float | None = None
+        self._checked = 0.0
+        self.rules = CompiledRules(default_rules(threshold))
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval_sec:
+            return False
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            rules = CompiledRules(data["rules"] if isinstance(data, dict) else data)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.reload_errors += 1
+            print("alert rules reload error:", e)
+            return False
+        finally:
+            self._mtime = mtime
+        rules.carry_counts(self.rules)
+        self.rules = rules
+        self.reloads += 1
+        return True
+
+    def evaluate(self, detections: list[dict]) -> list[tuple[str, str, str] | None]:
+        self.maybe_reload()
+        return self.rules.evaluate(detections)
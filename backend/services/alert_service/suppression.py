@@ -0,0 +1,121 @@
+"""
+Alert suppression: repeated detections of the same class on the same asset within a time window fold
+into the open alert instead of creating new rows. With an IoU threshold, only detections whose bbox
+overlaps the open alert's last bbox are folded, so two objects of one class in a frame stay separate.
+State is in memory, bounded by max_keys (LRU) and expired by window_seconds.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+
+def bbox_iou(a: Any, b: Any) -> float:
+    """IoU of two [x1, y1, x2, y2] boxes; 0.0 if either is missing or malformed."""
+    try:
+        ax1, ay1, ax2, ay2 = (float(v) for v in a)
+        bx1, by1, bx2, by2 = (float(v) for v in b)
+    except (TypeError, ValueError):
+        return 0.0
+    iw = max(0.0, min(ax2, bx2) - max(ax1, bx1))
+    ih = max(0.0, min(ay2, by2) - max(ay1, by1))
+    inter = iw * ih
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class OpenAlert:
+    alert_id: Any
+    bbox: Any
+    last_seen: float
+
+
+class AlertSuppressor:
+    """Not thread-safe; one per consumer loop."""
+
+    def __init__(self, window_seconds: float = 60.0, max_keys: int = 50000, iou_threshold: float = 0.0) -> None:
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.iou_threshold = iou_threshold
+        self._open: OrderedDict[tuple[str, str], list[OpenAlert]] = OrderedDict()
+        self._pending: dict[Any, list] = {}
+        self.suppressed = 0
+        self.passed = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def check(self, detection: dict, alert_id: Any, now: float | None = None) -> Any | None:
+        """Id of the open alert this detection folds into, or None if it should become alert_id."""
+        now = time.monotonic() if now is None else now
+        key = (str(detection.get("asset_id")), str(detection.get("class_name", "unknown")))
+        bbox = detection.get("bbox")
+        entries = [e for e in self._open.get(key, []) if now - e.last_seen < self.window_seconds]
+        for e in entries:
+            if self.iou_threshold <= 0 or bbox_iou(e.bbox, bbox) >= self.iou_threshold:
+                e.last_seen = now
+                e.bbox = bbox if bbox is not None else e.bbox
+                hit = self._pending.setdefault(e.alert_id, [0, None])
+                hit[0] += 1
+                hit[1] = str(detection.get("timestamp") or datetime.now(timezone.utc).isoformat())
+                self._open[key] = entries
+                self._open.move_to_end(key)
+                self.suppressed += 1
+                return e.alert_id
+        entries.append(OpenAlert(alert_id, bbox, now))
+        self._open[key] = entries
+        self._open.move_to_end(key)
+        while len(self._open) > self.max_keys:
+            self._open.popitem(last=False)
+            self.evictions += 1
+        self.passed += 1
+        return None
+
+    def take_hits(self) -> dict[Any, tuple[int, str]]:
+        """(suppressed hits, last_seen) per open alert since the last call."""
+        out = {alert_id: (hits, last_seen) for alert_id, (hits, last_seen) in self._pending.items()}
+        self._pending.clear()
+        return out
+
+    def forget(self, alert_ids: set) -> None:
+        """Drop open alerts that were closed in the DB so the next hit opens a new one."""
+        self.replace({alert_id: None for alert_id in alert_ids})
+
+    def replace(self, alert_ids: dict) -> None:
+        """Point open alerts closed in the DB at the alert that replaced them (old id -> new id), so later
+        hits fold into it; entries mapped to None are dropped and the next hit opens a new alert."""
+        for key in list(self._open):
+            entries = []
+            for e in self._open[key]:
+                if e.alert_id in alert_ids:
+                    if alert_ids[e.alert_id] is None:
+                        continue
+                    e.alert_id = alert_ids[e.alert_id]
+                entries.append(e)
+            if entries:
+                self._open[key] = entries
+            else:
+                del self._open[key]
+
+    def evict_expired(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for key in list(self._open):
+            entries = [e for e in self._open[key] if now - e.last_seen < self.window_seconds]
+            if entries:
+                self._open[key] = entries
+            else:
+                del self._open[key]
+                removed += 1
+        self.evictions += removed
+        return removed
+
+    @property
+    def suppression_ratio(self) -> float:
+        total = self.suppressed + self.passed
+        return self.suppressed / total if total else 0.0
@@ -0,0 +1,106 @@
+"""
+Single-flight coalescing of identical concurrent upstream GETs.
+While a GET for a key is in flight, later callers with the same key wait for that call instead of
+sending their own, and all of them get its result (or its exception). Keys are response_cache keys
+(route, sorted params, role, region set), so only callers the upstream would answer identically
+share a call. Nothing is kept once the call finishes: this collapses refresh waves, the response
+cache is what serves repeats.
+
+The upstream call runs in its own task. A caller that is cancelled (client went away) stops
+waiting without affecting the others; when the last caller leaves, the call is cancelled too and
+the next caller starts a fresh one.
+
+Configuration: GATEWAY_COALESCE_ENABLED (default true).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import defaultdict
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+COALESCE_ENABLED = os.getenv("GATEWAY_COALESCE_ENABLED", "true").lower() == "true"
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    def __init__(self, enabled: bool = COALESCE_ENABLED) -> None:
+        self.enabled = enabled
+        self._flights: dict[Hashable, _Flight] = {}
+        # Per route label: upstream calls made, callers that joined one, calls that failed or were abandoned.
+        self.leaders: dict[str, int] = defaultdict(int)
+        self.followers: dict[str, int] = defaultdict(int)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.abandoned: dict[str, int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, route: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Result of call(), shared with every concurrent caller of the same key."""
+        if not self.enabled:
+            return await call()
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._run(key, route, call)))
+            self._flights[key] = flight
+            self.leaders[route] += 1
+        else:
+            self.followers[route] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                flight.waiters -= 1
+                if flight.waiters == 0:
+                    self.abandoned[route] += 1
+                    flight.task.cancel()
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            raise
+
+    async def _run(self, key: Hashable, route: str, call: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await call()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors[route] += 1
+            raise
+        finally:
+            flight = self._flights.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._flights[key]
+
+    def render_metrics(self) -> list[str]:
+        counters = {
+            "gateway_coalesce_upstream_calls_total": (self.leaders, "Upstream GETs sent for coalescable requests."),
+            "gateway_coalesce_joined_total": (self.followers, "Requests that shared an in-flight upstream GET."),
+            "gateway_coalesce_errors_total": (self.errors, "Shared upstream GETs that failed (every waiter saw the error)."),
+            "gateway_coalesce_abandoned_total": (self.abandoned, "Shared upstream GETs cancelled after all waiters left."),
+        }
+        lines = []
+        for name, (values, help_text) in counters.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{route="{route}"}} {n}' for route, n in sorted(values.items())]
+        name = "gateway_coalesce_ratio"
+        lines += [f"# HELP {name} Share of requests served by another request's upstream GET.", f"# TYPE {name} gauge"]
+        for route in sorted(self.leaders):
+            total = self.leaders[route] + self.followers[route]
+            lines.append(f'{name}{{route="{route}"}} {self.followers[route] / total:.4f}')
+        lines += [
+            "# HELP gateway_coalesce_in_flight Upstream GETs currently shared.",
+            "# TYPE gateway_coalesce_in_flight gauge",
+            f"gateway_coalesce_in_flight {len(self._flights)}",
+        ]
+        return lines
@@ -2,30 +2,48 @@
 API Gateway: auth, RBAC, routing, and security (OWASP-aligned).
 All client traffic goes through here. JWT required for protected routes.
 """
+import asyncio
+import json
 import os
+import time
+from collections import defaultdict
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator
 
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import httpx
+from starlette.background import BackgroundTask
 
-from defense_shared.schemas import CommandIntent, Role
+from pydantic import ValidationError
+
+from defense_shared.schemas import AlertBulkUpdate, CommandIntent, Role
 from defense_shared.security import (
-    decode_jwt,
     filter_query_params,
+    jwt_cache_stats,
     sanitize_issued_by,
     ALLOWED_QUERY_ALERTS,
+    ALLOWED_QUERY_ALERT_STREAM,
+    ALLOWED_QUERY_ALERT_SUMMARY,
     ALLOWED_QUERY_ASSETS,
+    ALLOWED_QUERY_OVERVIEW,
+    ALLOWED_QUERY_SPATIAL,
+    ALLOWED_QUERY_STATE,
     ALLOWED_QUERY_TELEMETRY,
+    ALLOWED_QUERY_TELEMETRY_EXPORT,
 )
 from defense_shared.safeguardrails import (
     is_allowed_intent,
     validate_asset_id,
     validate_command_payload,
 )
-from middleware import SecurityHeadersMiddleware, RateLimitMiddleware, audit_log
+from coalesce import RequestCoalescer
+from middleware import SecurityHeadersMiddleware, RateLimitMiddleware, audit_log, verified_claims
+from rate_limit import RateLimiter
+from response_cache import ResponseCache, cache_key
+from upstream import POOL_TIMEOUT_SEC, UpstreamClients
 
 security = HTTPBearer(auto_error=False)
 
@@ -36,16 +54,43 @@ SERVICE_URLS = {
     "control": os.getenv("CONTROL_SERVICE_URL", "http://localhost:8004"),
     "inference": os.getenv("INFERENCE_SERVICE_URL", "http://localhost:8005"),
 }
+upstream = UpstreamClients(SERVICE_URLS)
+
+# Per-route upstream timeouts. Connections are normally reused from the pool, so connect is short;
+# pool bounds the wait for a free connection when an upstream is saturated.
+TIMEOUT_FAST = httpx.Timeout(5.0, connect=2.0, pool=POOL_TIMEOUT_SEC)
+TIMEOUT_QUERY = httpx.Timeout(10.0, connect=2.0, pool=POOL_TIMEOUT_SEC)
+TIMEOUT_BULK = httpx.Timeout(60.0, connect=2.0, pool=POOL_TIMEOUT_SEC)
+TIMEOUT_EXPORT = httpx.Timeout(10.0, read=60.0, pool=POOL_TIMEOUT_SEC)
+TIMEOUT_STREAM = httpx.Timeout(10.0, read=None, pool=POOL_TIMEOUT_SEC)
+
+# Polled routes are served from a short-lived response cache (see response_cache.py).
+response_cache = ResponseCache()
+CACHE_ASSETS_TTL_SEC = float(os.getenv("GATEWAY_CACHE_ASSETS_TTL_SEC", "5"))
+CACHE_TELEMETRY_TTL_SEC = float(os.getenv("GATEWAY_CACHE_TELEMETRY_TTL_SEC", "2"))
+CACHE_STALE_SEC = float(os.getenv("GATEWAY_CACHE_STALE_SEC", "10"))
+CACHE_TAGS = frozenset({"assets", "telemetry"})
+# Identical concurrent region-scoped GETs share one upstream call (see coalesce.py).
+coalescer = RequestCoalescer()
+
+# The overview fans out to its sections concurrently; whatever is not back by the deadline is
+# reported as timed out rather than holding up the page.
+OVERVIEW_DEADLINE_SEC = float(os.getenv("GATEWAY_OVERVIEW_DEADLINE_SEC", "3"))
+overview_sections: dict[tuple[str, str], int] = defaultdict(int)  # (section, status) -> count
+
+# Token buckets per IP, user and expensive route; shared through Redis when configured (rate_limit.py).
+rate_limiter = RateLimiter.from_env()
 
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
 ) -> dict:
     """Validate JWT and return user identity. 401 if missing or invalid."""
     if not credentials:
         raise HTTPException(status_code=401, detail="Missing or invalid token")
     token = credentials.credentials
-    payload = decode_jwt(token)
+    payload = verified_claims(request.scope, token)
     if payload:
         sub = payload.get("sub")
         role = payload.get("role", Role.LOCAL_OPERATOR.value)
@@ -68,14 +113,16 @@ def require_role(*allowed: Role):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    upstream.start()
     yield
+    await upstream.aclose()
 
 
 app = FastAPI(title="Defense API Gateway", lifespan=lifespan)
 
 origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip()]
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["GET", "POST", "PATCH", "OPTIONS"], allow_headers=["Authorization", "Content-Type"])
-app.add_middleware(RateLimitMiddleware)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 app.add_middleware(SecurityHeadersMiddleware)
 
 
@@ -84,42 +131,226 @@ async def health() -> dict:
     return {"status": "ok", "service": "api-gateway"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus exposition format: upstream connection pool utilization, response and JWT caches,
+    request coalescing, rate limiter, overview section outcomes."""
+    lines = upstream.render_metrics() + response_cache.render_metrics() + coalescer.render_metrics()
+    lines += rate_limiter.render_metrics()
+    lines += [
+        "# HELP gateway_overview_sections_total Overview sections by outcome (ok, timeout, error).",
+        "# TYPE gateway_overview_sections_total counter",
+    ]
+    lines += [
+        f'gateway_overview_sections_total{{section="{section}",status="{status}"}} {n}'
+        for (section, status), n in sorted(overview_sections.items())
+    ]
+    lines += [
+        "# HELP gateway_jwt_cache_hits_total Tokens accepted from the verified-token cache.",
+        "# TYPE gateway_jwt_cache_hits_total counter",
+        f"gateway_jwt_cache_hits_total {jwt_cache_stats['hits']}",
+        "# HELP gateway_jwt_cache_misses_total Tokens that needed signature verification.",
+        "# TYPE gateway_jwt_cache_misses_total counter",
+        f"gateway_jwt_cache_misses_total {jwt_cache_stats['misses']}",
+        "# HELP gateway_jwt_cache_rejected_total Tokens rejected from the failed-verification cache.",
+        "# TYPE gateway_jwt_cache_rejected_total counter",
+        f"gateway_jwt_cache_rejected_total {jwt_cache_stats['rejected_hits']}",
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
 def _proxy_headers(user: dict) -> dict[str, str]:
     return {"X-User-Id": user["id"], "X-User-Role": user["role"], "X-Region-Ids": ",".join(user.get("region_ids") or [])}
 
 
+async def _upstream_get(
+    route: str, service: str, path: str, params: dict, user: dict, timeout: httpx.Timeout
+) -> httpx.Response:
+    """GET path on service, shared with concurrent identical requests (same route, params, role and
+    regions). route is the route template; path may differ from it only by path parameters."""
+    key = (path, *cache_key(route, params, user))
+    return await coalescer.do(
+        key,
+        route,
+        lambda: upstream.get(service).get(path, params=params, headers=_proxy_headers(user), timeout=timeout),
+    )
+
+
+async def _cached_load(
+    tag: str, route: str, service: str, path: str, params: dict, user: dict, ttl: float, timeout: httpx.Timeout
+) -> tuple[int, bytes, str]:
+    """(status, body, cache state) of GET path on service through the response cache.
+    Misses and revalidations for the same key share one upstream call."""
+
+    async def load() -> tuple[int, bytes]:
+        r = await _upstream_get(route, service, path, params, user, timeout)
+        r.raise_for_status()
+        return r.status_code, r.content
+
+    return await response_cache.get(cache_key(route, params, user), tag, ttl, CACHE_STALE_SEC, load)
+
+
+async def _cached_get(
+    tag: str, route: str, service: str, path: str, params: dict, user: dict, ttl: float, timeout: httpx.Timeout
+) -> Response:
+    """GET path on service through the response cache; the upstream body is passed through unparsed."""
+    status, body, state = await _cached_load(tag, route, service, path, params, user, ttl, timeout)
+    return Response(content=body, status_code=status, media_type="application/json", headers={"X-Cache": state})
+
+
 @app.get("/api/v1/assets")
 async def list_assets(
     request: Request,
     user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
-) -> dict:
+) -> Response:
     params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_ASSETS)
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{SERVICE_URLS['asset']}/assets",
-            params=params,
-            headers=_proxy_headers(user),
-            timeout=10.0,
-        )
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get(
+        "assets", "/api/v1/assets", "asset", "/assets", params, user, CACHE_ASSETS_TTL_SEC, TIMEOUT_QUERY
+    )
 
 
 @app.get("/api/v1/telemetry/aggregated")
 async def get_telemetry(
     request: Request,
     user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
-) -> dict:
+) -> Response:
     params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_TELEMETRY)
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{SERVICE_URLS['telemetry']}/aggregated",
-            params=params,
-            headers=_proxy_headers(user),
-            timeout=10.0,
-        )
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get(
+        "telemetry", "/api/v1/telemetry/aggregated", "telemetry", "/aggregated", params, user,
+        CACHE_TELEMETRY_TTL_SEC, TIMEOUT_QUERY,
+    )
+
+
+async def _proxy_stream(
+    service: str,
+    path: str,
+    params: dict,
+    user: dict,
+    timeout: httpx.Timeout,
+    default_media_type: str,
+    headers: dict | None = None,
+) -> StreamingResponse:
+    """Pass an upstream response body through chunk by chunk; it is never buffered here.
+    Uses the service's streaming pool, so long-running streams never hold its regular connections.
+    4xx from upstream keeps its status and detail, anything else becomes 502."""
+    client = upstream.get(service, stream=True)
+    request = client.build_request("GET", path, params=params, headers=_proxy_headers(user), timeout=timeout)
+    try:
+        r = await client.send(request, stream=True)
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail=f"{service.capitalize()} service unavailable")
+    if r.is_error:
+        await r.aread()
+        await r.aclose()
+        if r.status_code < 500:
+            try:
+                detail = r.json().get("detail", "Bad request")
+            except ValueError:
+                detail = "Bad request"
+            raise HTTPException(status_code=r.status_code, detail=detail)
+        raise HTTPException(status_code=502, detail=f"{service.capitalize()} service error")
+    return StreamingResponse(
+        r.aiter_raw(),
+        media_type=r.headers.get("content-type", default_media_type),
+        headers=headers,
+        background=BackgroundTask(r.aclose),
+    )
+
+
+@app.get("/api/v1/telemetry/aggregated/export")
+async def export_telemetry(
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> StreamingResponse:
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_TELEMETRY_EXPORT)
+    response = await _proxy_stream(
+        "telemetry",
+        "/aggregated/export",
+        params,
+        user,
+        TIMEOUT_EXPORT,
+        "application/x-ndjson",
+    )
+    audit_log(request, user["id"], "export", "telemetry", params.get("format", "ndjson"))
+    return response
+
+
+@app.get("/api/v1/telemetry/state")
+async def list_asset_state(
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> dict:
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_STATE)
+    r = await _upstream_get("/api/v1/telemetry/state", "telemetry", "/state", params, user, TIMEOUT_FAST)
+    r.raise_for_status()
+    return r.json()
+
+
+@app.get("/api/v1/telemetry/state/{asset_id}")
+async def get_asset_state(
+    asset_id: str,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> dict:
+    if not validate_asset_id(asset_id) or asset_id.strip().lower() == "all":
+        raise HTTPException(status_code=400, detail="Invalid asset_id")
+    r = await _upstream_get(
+        "/api/v1/telemetry/state/{asset_id}", "telemetry", f"/state/{asset_id.strip()}", {}, user, TIMEOUT_FAST
+    )
+    if r.status_code == 404:
+        raise HTTPException(status_code=404, detail="No recent state for asset")
+    r.raise_for_status()
+    return r.json()
+
+
+SPATIAL_QUERIES = frozenset({"radius", "bbox", "nearest"})
+
+
+@app.get("/api/v1/telemetry/spatial/{query}")
+async def spatial_query(
+    query: str,
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR, Role.SYSTEM_AI)),
+) -> dict:
+    """Radius, bounding-box and k-nearest lookups over live asset positions."""
+    if query not in SPATIAL_QUERIES:
+        raise HTTPException(status_code=404, detail="Unknown spatial query")
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_SPATIAL)
+    r = await _upstream_get(
+        "/api/v1/telemetry/spatial/{query}", "telemetry", f"/spatial/{query}", params, user, TIMEOUT_FAST
+    )
+    if r.status_code in (400, 422):
+        raise HTTPException(status_code=400, detail="Invalid spatial query parameters")
+    r.raise_for_status()
+    return r.json()
+
+
+@app.get("/api/v1/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> StreamingResponse:
+    """Server-sent alert events. Region scoping is applied by the alert service from the proxy headers."""
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_ALERT_STREAM)
+    return await _proxy_stream(
+        "alert",
+        "/alerts/stream",
+        params,
+        user,
+        TIMEOUT_STREAM,
+        "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/v1/alerts/summary")
+async def alert_summary(
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> dict:
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_ALERT_SUMMARY)
+    r = await _upstream_get("/api/v1/alerts/summary", "alert", "/alerts/summary", params, user, TIMEOUT_FAST)
+    r.raise_for_status()
+    return r.json()
 
 
 @app.get("/api/v1/alerts")
@@ -128,16 +359,114 @@ async def list_alerts(
     user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
 ) -> dict:
     params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_ALERTS)
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{SERVICE_URLS['alert']}/alerts",
-            params=params,
-            headers=_proxy_headers(user),
-            timeout=10.0,
+    r = await _upstream_get("/api/v1/alerts", "alert", "/alerts", params, user, TIMEOUT_QUERY)
+    r.raise_for_status()
+    return r.json()
+
+
+async def _overview_section(name: str, load, deadline: float) -> dict:
+    """Run one overview section until the shared deadline: {"status": "ok", "data", "ms"} or
+    {"status": "timeout" | "error", "detail", "ms"}."""
+    started = time.monotonic()
+    try:
+        out = {"status": "ok", "data": await asyncio.wait_for(load(), timeout=max(0.0, deadline - started))}
+    except asyncio.TimeoutError:
+        out = {"status": "timeout", "detail": f"No response within {OVERVIEW_DEADLINE_SEC:g}s"}
+    except httpx.HTTPStatusError as e:
+        out = {"status": "error", "detail": f"Upstream returned {e.response.status_code}"}
+    except (httpx.HTTPError, ValueError):
+        out = {"status": "error", "detail": "Upstream unavailable"}
+    out["ms"] = round((time.monotonic() - started) * 1000, 1)
+    overview_sections[(name, out["status"])] += 1
+    return out
+
+
+@app.get("/api/v1/overview")
+async def overview(
+    request: Request,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> dict:
+    """Dashboard home in one call: assets, recent alerts, alert summary and live asset state, fetched
+    concurrently under one deadline (GATEWAY_OVERVIEW_DEADLINE_SEC). Sections that fail or miss the
+    deadline are reported per section and the rest is returned; 502 only if every section failed.
+    Each section goes through the same cache and coalescing as its own route."""
+    params = filter_query_params(dict(request.query_params), ALLOWED_QUERY_OVERVIEW)
+    region = {"region_id": params["region_id"]} if "region_id" in params else {}
+    try:
+        alerts_limit = min(max(int(params.get("alerts_limit", "20")), 1), 100)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid alerts_limit")
+
+    async def assets() -> Any:
+        status, body, _ = await _cached_load(
+            "assets", "/api/v1/assets", "asset", "/assets", region, user, CACHE_ASSETS_TTL_SEC, TIMEOUT_QUERY
         )
+        return json.loads(body)
+
+    async def upstream_json(route: str, service: str, path: str, query: dict, timeout: httpx.Timeout) -> Any:
+        r = await _upstream_get(route, service, path, query, user, timeout)
         r.raise_for_status()
         return r.json()
 
+    loaders = {
+        "assets": assets,
+        "alerts": lambda: upstream_json(
+            "/api/v1/alerts", "alert", "/alerts", {**region, "limit": str(alerts_limit)}, TIMEOUT_QUERY
+        ),
+        "alert_summary": lambda: upstream_json(
+            "/api/v1/alerts/summary", "alert", "/alerts/summary", region, TIMEOUT_FAST
+        ),
+        "telemetry_state": lambda: upstream_json(
+            "/api/v1/telemetry/state", "telemetry", "/state", region, TIMEOUT_FAST
+        ),
+    }
+    deadline = time.monotonic() + OVERVIEW_DEADLINE_SEC
+    results = await asyncio.gather(*(_overview_section(name, load, deadline) for name, load in loaders.items()))
+    sections = dict(zip(loaders, results))
+    if all(s["status"] != "ok" for s in results):
+        raise HTTPException(status_code=502, detail="Overview upstreams unavailable")
+    return {"sections": sections, "partial": any(s["status"] != "ok" for s in results)}
+
+
+def _validate_alert_bulk_body(body: Any) -> dict:
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Body must be JSON object")
+    try:
+        validated = AlertBulkUpdate.model_validate({k: v for k, v in body.items() if k != "user_id"})
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="Invalid bulk alert request")
+    if (validated.ids is None) == (validated.filter is None):
+        raise HTTPException(status_code=400, detail="Exactly one of ids or filter is required")
+    return validated.model_dump(mode="json", exclude_none=True)
+
+
+@app.post("/api/v1/alerts/bulk")
+async def bulk_update_alerts(
+    request: Request,
+    body: dict,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
+) -> dict:
+    """Acknowledge, resolve or escalate many alerts at once; the acting user comes from the token and
+    region scoping is applied by the alert service from the proxy headers."""
+    payload = _validate_alert_bulk_body(body)
+    r = await upstream.get("alert").post(
+        "/alerts/bulk",
+        json=payload,
+        headers=_proxy_headers(user),
+        timeout=TIMEOUT_BULK,
+    )
+    if 400 <= r.status_code < 500:
+        try:
+            detail = r.json().get("detail", "Bad request")
+        except ValueError:
+            detail = "Bad request"
+        raise HTTPException(status_code=r.status_code, detail=detail)
+    r.raise_for_status()
+    out = r.json()
+    target = f"ids={len(payload['ids'])}" if "ids" in payload else f"filter={json.dumps(payload['filter'], sort_keys=True)}"
+    audit_log(request, user["id"], f"bulk_{payload['action']}", "alert", f"{target} updated={out.get('updated')}")
+    return out
+
 
 def _validate_emergency_stop_body(body: Any) -> dict:
     if not isinstance(body, dict):
@@ -158,15 +487,16 @@ async def emergency_stop(
 ) -> dict:
     validated = _validate_emergency_stop_body(body)
     payload_to_control = {**validated, "issued_by": user["id"]}
-    async with httpx.AsyncClient() as client:
-        r = await client.post(
-            f"{SERVICE_URLS['control']}/emergency-stop",
-            json=payload_to_control,
-            headers=_proxy_headers(user),
-            timeout=5.0,
-        )
-        r.raise_for_status()
-        out = r.json()
+    r = await upstream.get("control").post(
+        "/emergency-stop",
+        json=payload_to_control,
+        headers=_proxy_headers(user),
+        timeout=TIMEOUT_FAST,
+    )
+    r.raise_for_status()
+    out = r.json()
+    # Asset status changes with the stop; do not serve the old status from cache.
+    response_cache.invalidate("assets")
     audit_log(request, user["id"], "emergency_stop", "control", validated.get("asset_id", "all"))
     return out
 
@@ -202,27 +532,43 @@ async def send_command(
     user: dict = Depends(require_role(Role.SUPER_ADMIN, Role.LOCAL_OPERATOR)),
 ) -> dict:
     payload_to_control = _validate_command_body(body, user)
-    async with httpx.AsyncClient() as client:
-        r = await client.post(
-            f"{SERVICE_URLS['control']}/command",
-            json=payload_to_control,
-            headers=_proxy_headers(user),
-            timeout=10.0,
-        )
-        r.raise_for_status()
-        out = r.json()
+    r = await upstream.get("control").post(
+        "/command",
+        json=payload_to_control,
+        headers=_proxy_headers(user),
+        timeout=TIMEOUT_QUERY,
+    )
+    r.raise_for_status()
+    out = r.json()
+    response_cache.invalidate("assets")
     audit_log(request, user["id"], "command", "control", payload_to_control.get("intent", ""))
     return out
 
 
+@app.post("/api/v1/admin/cache/invalidate")
+async def invalidate_cache(
+    request: Request,
+    body: dict,
+    user: dict = Depends(require_role(Role.SUPER_ADMIN)),
+) -> dict:
+    """Drop cached responses of one tag ("assets", "telemetry") or, without a tag, all of them."""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Body must be JSON object")
+    tag = body.get("tag")
+    if tag is not None and tag not in CACHE_TAGS:
+        raise HTTPException(status_code=400, detail="Unknown cache tag")
+    dropped = response_cache.invalidate(tag)
+    audit_log(request, user["id"], "cache_invalidate", "gateway", tag or "all")
+    return {"ok": True, "tag": tag, "dropped": dropped}
+
+
 @app.get("/api/v1/inference/health")
 async def inference_health(
     user: dict = Depends(get_current_user),
 ) -> dict:
-    async with httpx.AsyncClient() as client:
-        r = await client.get(f"{SERVICE_URLS['inference']}/health", timeout=5.0)
-        r.raise_for_status()
-        return r.json()
+    r = await upstream.get("inference").get("/health", timeout=TIMEOUT_FAST)
+    r.raise_for_status()
+    return r.json()
 
 
 REPLAY_DIR = os.getenv("REPLAY_DIR", "")
@@ -243,7 +589,6 @@ async def get_simulation_replay(
         raise HTTPException(status_code=404, detail="Replay not found")
     try:
         with open(path) as f:
-            import json
             return json.load(f)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to load replay")
@@ -1,60 +1,128 @@
 """
 Security middleware: rate limit, security headers, audit logging for sensitive paths.
+Both middlewares are plain ASGI callables that only touch the http.response.start message, so
+response bodies (including streamed exports and SSE) pass through untouched and unbuffered.
+Rate limiting itself (token buckets per IP, user and route) lives in rate_limit.py.
 """
-import time
-from collections import defaultdict
-from typing import Callable
+import math
+import os
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
 
-from defense_shared.security import security_headers
+from defense_shared.security import decode_jwt, security_headers
+from rate_limit import RATE_LIMIT_MAX, RATE_LIMIT_WINDOW, RateLimiter
 
-# In-memory rate limit: key -> (count, window_start). Use Redis in production.
-_rate_store: dict[str, tuple[int, float]] = defaultdict(lambda: (0, 0.0))
-RATE_LIMIT_WINDOW = 60
-RATE_LIMIT_MAX = 120
-RATE_LIMIT_AUTH_MAX = 10
+# Encoded once; security_headers() is fixed for the life of the process.
+SECURITY_HEADERS = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in security_headers().items()]
+_SECURITY_HEADER_NAMES = frozenset(k for k, _ in SECURITY_HEADERS)
+_TOO_MANY_REQUESTS = b"Too Many Requests"
 
 
-def _rate_limit_key(request: Request) -> str:
-    forwarded = request.headers.get("X-Forwarded-For")
+def _header(scope: dict, name: bytes) -> bytes | None:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v
+    return None
+
+
+def _client_ip(scope: dict) -> str:
+    forwarded = _header(scope, b"x-forwarded-for")
     if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        for k, v in security_headers().items():
-            response.headers[k] = v
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, window: int = RATE_LIMIT_WINDOW, max_requests: int = RATE_LIMIT_MAX):
-        super().__init__(app)
-        self.window = window
-        self.max_requests = max_requests
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        key = _rate_limit_key(request)
-        path = request.url.path
-        is_auth = path.endswith("/login") or "login" in path
-        limit = RATE_LIMIT_AUTH_MAX if is_auth else self.max_requests
-        now = time.time()
-        count, start = _rate_store[key]
-        if now - start > self.window:
-            count, start = 0, now
-        count += 1
-        _rate_store[key] = (count, start)
-        if count > limit:
-            return Response(status_code=429, content="Too Many Requests")
-        response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, limit - count))
-        return response
+        return forwarded.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", ()) if h[0] not in _SECURITY_HEADER_NAMES]
+                message = {**message, "headers": headers + SECURITY_HEADERS}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def _bearer(scope: dict) -> str | None:
+    auth = _header(scope, b"authorization")
+    if not auth or not auth[:7].lower() == b"bearer ":
+        return None
+    return auth[7:].decode("latin-1").strip()
+
+
+def verified_claims(scope: dict, token: str) -> dict | None:
+    """decode_jwt(token), reusing the result the rate limiter stored in the request state so each
+    request verifies its token at most once."""
+    seen = scope.get("state", {}).get("jwt")
+    if seen is not None and seen[0] == token:
+        return seen[1]
+    return decode_jwt(token)
+
+
+def _user(scope: dict) -> str | None:
+    """Token subject for per-user limits. None if anonymous or invalid (such requests are rejected by
+    auth and still count against their IP). The claims are kept in the request state for auth."""
+    token = _bearer(scope)
+    if not token:
+        return None
+    payload = decode_jwt(token)
+    scope.setdefault("state", {})["jwt"] = (token, payload)
+    if payload:
+        return str(payload.get("sub") or "") or None
+    if os.getenv("ALLOW_DEV_TOKEN") == "true" and token == "dev-token":
+        return "dev-user"
+    return None
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter | None = None,
+        window: int = RATE_LIMIT_WINDOW,
+        max_requests: int = RATE_LIMIT_MAX,
+    ):
+        self.app = app
+        self.limiter = limiter or RateLimiter(window=window, ip_max=max_requests)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        decision = await self.limiter.check(_client_ip(scope), scope["path"], _user(scope))
+        if not decision.allowed:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(_TOO_MANY_REQUESTS)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(decision.retry_after))).encode()),
+                    (b"x-ratelimit-limit", str(decision.limit).encode()),
+                    (b"x-ratelimit-remaining", b"0"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _TOO_MANY_REQUESTS})
+            return
+        rate_headers = [
+            (b"x-ratelimit-limit", str(decision.limit).encode()),
+            (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+        ]
+
+        async def send_with_headers(message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", ())) + rate_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 
 def audit_log(request: Request, user_id: str, action: str, resource: str, detail: str = "") -> None:
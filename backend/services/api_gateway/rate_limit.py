@@ -0,0 +1,249 @@
+"""
+Token-bucket rate limiting for the gateway.
+Every request draws one token from each bucket that applies to it: the client IP, the authenticated
+user (token subject) and, for routes with their own limit, that route per user (or per IP). A bucket
+holds up to `limit` tokens and refills at limit/window per second, so short bursts are allowed
+while the long-run rate is the configured one. A request is admitted only if every bucket has a
+token, and then all of them are charged; updates are O(1) per bucket.
+
+Buckets live in a BucketStore. LocalBucketStore keeps them in process, bounded by max_keys with LRU
+eviction; an evicted bucket was idle the longest and at worst restarts full. RedisBucketStore shares
+them between gateway replicas with one Lua script call per request (all buckets of a request are
+checked and charged atomically, keys expire once a bucket would be full again). If Redis fails,
+the limiter falls back to its local store rather than rejecting or admitting everything, and skips
+Redis for GATEWAY_RATE_LIMIT_BACKEND_BACKOFF_SEC so an outage does not add the socket timeout to
+every request.
+The Lua script touches several keys per call, so it needs a single Redis instance, not a cluster.
+
+Configuration (limits are per RATE_LIMIT_WINDOW seconds):
+    GATEWAY_RATE_LIMIT_IP_MAX        per client IP, default 120 (10 on login paths)
+    GATEWAY_RATE_LIMIT_USER_MAX      per authenticated user, default 300
+    GATEWAY_RATE_LIMIT_ROUTES        JSON {path prefix: limit}, overrides the built-in route limits
+    GATEWAY_RATE_LIMIT_MAX_KEYS      local buckets kept, default 100000
+    GATEWAY_RATE_LIMIT_REDIS_URL     shared backend; unset keeps limits per process
+    GATEWAY_RATE_LIMIT_BACKEND_BACKOFF_SEC  skip the shared backend this long after a failure, default 5
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_WINDOW = 60
+RATE_LIMIT_MAX = int(os.getenv("GATEWAY_RATE_LIMIT_IP_MAX", "120"))
+RATE_LIMIT_AUTH_MAX = 10
+RATE_LIMIT_USER_MAX = int(os.getenv("GATEWAY_RATE_LIMIT_USER_MAX", "300"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("GATEWAY_RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_REDIS_URL = os.getenv("GATEWAY_RATE_LIMIT_REDIS_URL", "")
+RATE_LIMIT_BACKEND_BACKOFF_SEC = float(os.getenv("GATEWAY_RATE_LIMIT_BACKEND_BACKOFF_SEC", "5"))
+# Expensive or sensitive routes, limited per caller on top of the IP and user limits.
+DEFAULT_ROUTE_LIMITS = {
+    "/api/v1/control/": 30,
+    "/api/v1/alerts/bulk": 10,
+    "/api/v1/telemetry/aggregated/export": 10,
+    "/api/v1/admin/": 10,
+}
+
+# (key, capacity, refill per second)
+Bucket = tuple[str, float, float]
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+class BucketStore(Protocol):
+    async def acquire(self, buckets: list[Bucket]) -> tuple[bool, int, float]:
+        """Charge one token from every bucket if all have one: (allowed, min remaining, retry after)."""
+
+
+class LocalBucketStore:
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (tokens, updated)
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire_sync(self, buckets: list[Bucket], now: float | None = None) -> tuple[bool, int, float]:
+        now = time.monotonic() if now is None else now
+        levels = []
+        allowed = True
+        retry_after = 0.0
+        for key, capacity, rate in buckets:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            levels.append(tokens)
+            if tokens < 1:
+                allowed = False
+                retry_after = max(retry_after, (1 - tokens) / rate)
+        remaining = math.inf
+        for (key, _, _), tokens in zip(buckets, levels):
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            remaining = min(remaining, tokens)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return allowed, int(remaining), retry_after
+
+    async def acquire(self, buckets: list[Bucket]) -> tuple[bool, int, float]:
+        return self.acquire_sync(buckets)
+
+
+# Same algorithm as LocalBucketStore, on Redis server time. ARGV holds capacity, rate per key.
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels = {}
+local allowed = 1
+local retry = 0
+for i = 1, #KEYS do
+    local cap = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local b = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(b[1]) or cap
+    local ts = tonumber(b[2]) or now
+    tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        allowed = 0
+        retry = math.max(retry, (1 - tokens) / rate)
+    end
+end
+local remaining = nil
+for i = 1, #KEYS do
+    local cap = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local tokens = levels[i]
+    if allowed == 1 then tokens = tokens - 1 end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[i], math.ceil((cap - tokens) / rate * 1000) + 1000)
+    if remaining == nil or tokens < remaining then remaining = tokens end
+end
+return {allowed, math.floor(remaining), tostring(retry)}
+"""
+
+
+class RedisBucketStore:
+    def __init__(self, client, prefix: str = "ratelimit:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_ACQUIRE_LUA)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBucketStore":
+        import redis.asyncio as redis
+
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+    async def acquire(self, buckets: list[Bucket]) -> tuple[bool, int, float]:
+        keys = [self.prefix + key for key, _, _ in buckets]
+        args: list[str] = []
+        for _, capacity, rate in buckets:
+            args += [repr(float(capacity)), repr(float(rate))]
+        allowed, remaining, retry_after = await self._script(keys=keys, args=args)
+        return bool(int(allowed)), int(remaining), float(retry_after)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        window: float = RATE_LIMIT_WINDOW,
+        ip_max: int = RATE_LIMIT_MAX,
+        user_max: int = RATE_LIMIT_USER_MAX,
+        auth_max: int = RATE_LIMIT_AUTH_MAX,
+        route_limits: dict[str, int] | None = None,
+        store: BucketStore | None = None,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+        backend_backoff: float = RATE_LIMIT_BACKEND_BACKOFF_SEC,
+    ) -> None:
+        self.window = window
+        self.ip_max = ip_max
+        self.user_max = user_max
+        self.auth_max = auth_max
+        # Longest prefix first so the most specific route limit applies.
+        self.route_limits = sorted((route_limits if route_limits is not None else DEFAULT_ROUTE_LIMITS).items(),
+                                   key=lambda kv: -len(kv[0]))
+        self.local = LocalBucketStore(max_keys)
+        self.store = store
+        self.backend_backoff = backend_backoff
+        self._backend_retry_at = 0.0
+        self.allowed = 0
+        self.rejected = 0
+        self.backend_errors = 0
+        self.backend_skipped = 0
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        raw = os.getenv("GATEWAY_RATE_LIMIT_ROUTES", "")
+        routes = {str(k): int(v) for k, v in json.loads(raw).items()} if raw else None
+        store = RedisBucketStore.from_url(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else None
+        return cls(route_limits=routes, store=store)
+
+    def buckets(self, ip: str, path: str, user: str | None) -> list[Bucket]:
+        is_auth = "login" in path
+        ip_max = self.auth_max if is_auth else self.ip_max
+        out: list[Bucket] = [(f"ip:{ip}", ip_max, ip_max / self.window)]
+        if user:
+            out.append((f"user:{user}", self.user_max, self.user_max / self.window))
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                out.append((f"route:{prefix}:{user or 'ip:' + ip}", limit, limit / self.window))
+                break
+        return out
+
+    async def check(self, ip: str, path: str, user: str | None = None) -> Decision:
+        buckets = self.buckets(ip, path, user)
+        result = None
+        if self.store is not None and time.monotonic() < self._backend_retry_at:
+            self.backend_skipped += 1
+        elif self.store is not None:
+            try:
+                result = await self.store.acquire(buckets)
+            except Exception as e:
+                self.backend_errors += 1
+                self._backend_retry_at = time.monotonic() + self.backend_backoff
+                logger.warning(
+                    "shared rate limit backend failed, limiting locally for %.0fs: %s", self.backend_backoff, e
+                )
+        if result is None:
+            result = self.local.acquire_sync(buckets)
+        allowed, remaining, retry_after = result
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        limit = int(min(capacity for _, capacity, _ in buckets))
+        return Decision(allowed, limit, max(0, remaining), retry_after)
+
+    def render_metrics(self) -> list[str]:
+        series = [
+            ("gateway_rate_limit_allowed_total", "counter", "Requests admitted by the rate limiter.", self.allowed),
+            ("gateway_rate_limit_rejected_total", "counter", "Requests rejected with 429.", self.rejected),
+            ("gateway_rate_limit_backend_errors_total", "counter", "Shared backend failures (fell back to local).",
+             self.backend_errors),
+            ("gateway_rate_limit_backend_skipped_total", "counter",
+             "Requests limited locally while the shared backend was backing off.", self.backend_skipped),
+            ("gateway_rate_limit_local_buckets", "gauge", "Buckets held in process.", len(self.local)),
+            ("gateway_rate_limit_local_evictions_total", "counter", "Local buckets evicted to stay bounded.",
+             self.local.evictions),
+        ]
+        lines = []
+        for name, kind, help_text, value in series:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return lines
@@ -0,0 +1,152 @@
+"""
+In-memory cache of upstream JSON responses for the gateway's most polled GET routes.
+Entries are keyed by route, the (already allow-listed) query params in sorted order, and the caller's
+role plus sorted region set: upstream services scope results only by those proxy headers, so callers
+with the same role and regions may share a response but no response crosses a region boundary.
+An entry is fresh for ttl seconds and then served stale for up to stale seconds more while one
+background request refreshes it (stale-while-revalidate). Raw response bodies are kept, so a hit
+costs neither a JSON parse nor a re-serialization; total body bytes are bounded with LRU eviction.
+invalidate(tag) drops every entry of a tag (e.g. "assets") when the gateway knows data changed.
+
+Configuration: GATEWAY_CACHE_ENABLED (default true), GATEWAY_CACHE_MAX_BYTES (default 32 MiB).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from defense_shared.schemas import Role
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("GATEWAY_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Loader returns (status code, body); only 200 responses are cached.
+Loader = Callable[[], Awaitable[tuple[int, bytes]]]
+CacheKey = tuple[str, tuple[tuple[str, str], ...], str, tuple[str, ...]]
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    tag: str
+    fresh_until: float
+    stale_until: float
+
+
+def cache_key(route: str, params: dict[str, str], user: dict) -> CacheKey:
+    role = user.get("role", "")
+    # Upstreams ignore regions for super admins, so all of them share one entry.
+    regions = () if role == Role.SUPER_ADMIN.value else tuple(sorted(set(user.get("region_ids") or [])))
+    return (route, tuple(sorted(params.items())), role, regions)
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, enabled: bool = CACHE_ENABLED) -> None:
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._refreshing: dict[CacheKey, asyncio.Task] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.revalidation_errors = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry.body)
+
+    def _store(self, key: CacheKey, body: bytes, tag: str, ttl: float, stale: float) -> None:
+        if len(body) > self.max_bytes // 8:
+            return  # one oversized body would flush most of the cache
+        self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = _Entry(body, tag, now + ttl, now + ttl + stale)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= len(old.body)
+            self.evictions += 1
+
+    def invalidate(self, tag: str | None = None) -> int:
+        """Drop all entries of a tag (all entries if tag is None); returns how many were dropped."""
+        keys = [k for k, e in self._entries.items() if tag is None or e.tag == tag]
+        for k in keys:
+            self._remove(k)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    async def get(
+        self, key: CacheKey, tag: str, ttl: float, stale: float, load: Loader
+    ) -> tuple[int, bytes, str]:
+        """(status, body, "HIT" | "STALE" | "MISS"); load is awaited on a miss and run in the
+        background when a stale entry is served."""
+        if not self.enabled:
+            status, body = await load()
+            return status, body, "MISS"
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return 200, entry.body, "HIT"
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._revalidate(key, tag, ttl, stale, load))
+            return 200, entry.body, "STALE"
+        self.misses += 1
+        status, body = await load()
+        if status == 200:
+            self._store(key, body, tag, ttl, stale)
+        return status, body, "MISS"
+
+    async def _revalidate(self, key: CacheKey, tag: str, ttl: float, stale: float, load: Loader) -> None:
+        self.revalidations += 1
+        try:
+            status, body = await load()
+            if status == 200 and key in self._entries:
+                self._store(key, body, tag, ttl, stale)
+            elif status != 200:
+                self.revalidation_errors += 1
+        except Exception as e:
+            # The stale entry keeps being served until it expires; the next stale hit retries.
+            self.revalidation_errors += 1
+            logger.warning("cache revalidation failed for %s: %s", key[0], e)
+        finally:
+            self._refreshing.pop(key, None)
+
+    def render_metrics(self) -> list[str]:
+        counters = {
+            "gateway_cache_hits_total": (self.hits, "Responses served fresh from the cache."),
+            "gateway_cache_stale_hits_total": (self.stale_hits, "Stale responses served while revalidating."),
+            "gateway_cache_misses_total": (self.misses, "Requests that had to wait for the upstream."),
+            "gateway_cache_revalidations_total": (self.revalidations, "Background refreshes of stale entries."),
+            "gateway_cache_revalidation_errors_total": (self.revalidation_errors, "Background refreshes that failed."),
+            "gateway_cache_evictions_total": (self.evictions, "Entries evicted to stay within the byte budget."),
+            "gateway_cache_invalidations_total": (self.invalidations, "Entries dropped by invalidation."),
+        }
+        gauges = {
+            "gateway_cache_entries": (len(self._entries), "Cached responses."),
+            "gateway_cache_bytes": (self.bytes, "Bytes of cached response bodies."),
+        }
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for name, (value, help_text) in series.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return lines
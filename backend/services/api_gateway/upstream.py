@@ -0,0 +1,158 @@
+"""
+Long-lived pooled HTTP clients for the gateway's upstream services, one per service, so proxied
+requests reuse keep-alive connections instead of opening a connection (and pool) per request.
+Streaming routes (exports, SSE) get a separate client per service: a long-lived stream holds its
+connection for as long as it runs and must not starve ordinary requests of pool slots.
+
+Configuration:
+    GATEWAY_UPSTREAM_MAX_CONNECTIONS      per service, default 100
+    GATEWAY_UPSTREAM_MAX_KEEPALIVE        idle connections kept per service, default 20
+    GATEWAY_UPSTREAM_KEEPALIVE_EXPIRY_SEC default 30
+    GATEWAY_UPSTREAM_POOL_TIMEOUT_SEC     wait for a free connection before failing, default 5
+    GATEWAY_STREAM_MAX_CONNECTIONS        per service for streaming routes, default 500
+    GATEWAY_UPSTREAM_HTTP2                "true" to negotiate HTTP/2 (needs the h2 package, i.e.
+                                          httpx[http2]; only used for https upstreams)
+"""
+from __future__ import annotations
+
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = int(os.getenv("GATEWAY_UPSTREAM_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("GATEWAY_UPSTREAM_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY_SEC = float(os.getenv("GATEWAY_UPSTREAM_KEEPALIVE_EXPIRY_SEC", "30"))
+POOL_TIMEOUT_SEC = float(os.getenv("GATEWAY_UPSTREAM_POOL_TIMEOUT_SEC", "5"))
+STREAM_MAX_CONNECTIONS = int(os.getenv("GATEWAY_STREAM_MAX_CONNECTIONS", "500"))
+HTTP2 = os.getenv("GATEWAY_UPSTREAM_HTTP2", "false").lower() == "true"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """Transport that tracks requests in flight (until the response body is closed) and errors."""
+
+    def __init__(self, stats: "PoolStats", **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        stats.requests += 1
+        stats.in_flight += 1
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            stats.in_flight -= 1
+            stats.errors += 1
+            raise
+        response.stream = _TrackedStream(response.stream, stats)
+        return response
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, stats: "PoolStats") -> None:
+        self._stream = stream
+        self._stats = stats
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._stats.in_flight -= 1
+        await self._stream.aclose()
+
+
+class PoolStats:
+    def __init__(self, max_connections: int) -> None:
+        self.max_connections = max_connections
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.transport: _CountingTransport | None = None
+
+    def connections(self) -> tuple[int, int]:
+        """(open, idle) connections in the pool; read from httpcore's pool, (0, 0) if unavailable."""
+        pool = getattr(self.transport, "_pool", None)
+        conns = list(getattr(pool, "connections", []) or [])
+        return len(conns), sum(1 for c in conns if c.is_idle())
+
+
+class UpstreamClients:
+    def __init__(self, base_urls: dict[str, str]) -> None:
+        self.base_urls = base_urls
+        self.http2 = HTTP2 and _http2_available()
+        if HTTP2 and not self.http2:
+            logger.warning("GATEWAY_UPSTREAM_HTTP2 set but h2 is not installed; using HTTP/1.1")
+        self._clients: dict[tuple[str, bool], httpx.AsyncClient] = {}
+        self.stats: dict[tuple[str, bool], PoolStats] = {}
+
+    def get(self, service: str, stream: bool = False) -> httpx.AsyncClient:
+        """The shared client for a service, created on first use (lifespan calls start() up front)."""
+        key = (service, stream)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            max_conns = STREAM_MAX_CONNECTIONS if stream else MAX_CONNECTIONS
+            stats = self.stats.setdefault(key, PoolStats(max_conns))
+            limits = httpx.Limits(
+                max_connections=max_conns,
+                # Stream connections are rarely reused, so keep few of them idle.
+                max_keepalive_connections=min(MAX_KEEPALIVE, max_conns) if not stream else 4,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SEC,
+            )
+            stats.transport = _CountingTransport(stats, limits=limits, http2=self.http2)
+            client = httpx.AsyncClient(
+                base_url=self.base_urls[service],
+                transport=stats.transport,
+                timeout=httpx.Timeout(10.0, pool=POOL_TIMEOUT_SEC),
+            )
+            self._clients[key] = client
+        return client
+
+    def start(self) -> None:
+        for service in self.base_urls:
+            self.get(service)
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def render_metrics(self) -> list[str]:
+        """Prometheus lines for every pool: requests, errors, in-flight, open/idle connections, limit."""
+        series = {
+            "gateway_upstream_requests_total": ("counter", "Requests sent upstream."),
+            "gateway_upstream_errors_total": ("counter", "Upstream requests that failed without a response."),
+            "gateway_upstream_in_flight": ("gauge", "Upstream requests whose response is not finished."),
+            "gateway_upstream_connections": ("gauge", "Open upstream connections."),
+            "gateway_upstream_idle_connections": ("gauge", "Idle keep-alive upstream connections."),
+            "gateway_upstream_max_connections": ("gauge", "Connection limit of the pool."),
+        }
+        values: dict[str, list[str]] = {name: [] for name in series}
+        for (service, stream), stats in sorted(self.stats.items()):
+            labels = f'{{upstream="{service}",pool="{"stream" if stream else "default"}"}}'
+            open_conns, idle = stats.connections()
+            values["gateway_upstream_requests_total"].append(f"{labels} {stats.requests}")
+            values["gateway_upstream_errors_total"].append(f"{labels} {stats.errors}")
+            values["gateway_upstream_in_flight"].append(f"{labels} {stats.in_flight}")
+            values["gateway_upstream_connections"].append(f"{labels} {open_conns}")
+            values["gateway_upstream_idle_connections"].append(f"{labels} {idle}")
+            values["gateway_upstream_max_connections"].append(f"{labels} {stats.max_connections}")
+        lines = []
+        for name, (kind, help_text) in series.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{v}" for v in values[name]]
+        return lines
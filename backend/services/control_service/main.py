@@ -10,6 +10,7 @@ from uuid import UUID
 from fastapi import FastAPI, Depends, HTTPException
 import asyncpg
 
+from defense_shared.pagination import decode_cursor, next_cursor
 from defense_shared.schemas import CommandIntent, CommandRequest
 from defense_shared.safeguardrails import is_allowed_intent, validate_command_payload, validate_asset_id
 from defense_shared.security import sanitize_issued_by
@@ -119,21 +120,33 @@ async def send_command(
 async def list_audit(
     asset_id: str | None = None,
     limit: int = 100,
+    cursor: str | None = None,
     db: asyncpg.Pool = Depends(get_pool),
 ) -> dict:
-    """List recent command log entries (for super admin / debugging). Limit capped for safety."""
+    """List recent command log entries (for super admin / debugging). Limit capped for safety.
+    Pass next_cursor from the previous response as cursor for the next page."""
     limit = min(max(1, limit), MAX_AUDIT_LIMIT)
+    conditions = ["TRUE"]
+    args: list = []
     if asset_id and validate_asset_id(asset_id) and asset_id.strip().lower() != "all":
-        rows = await db.fetch(
-            "SELECT id, asset_id, intent, issued_by, is_override, payload, result, created_at FROM audit.command_log WHERE asset_id = $1::uuid ORDER BY created_at DESC LIMIT $2",
-            asset_id,
-            limit,
-        )
-    else:
-        rows = await db.fetch(
-            "SELECT id, asset_id, intent, issued_by, is_override, payload, result, created_at FROM audit.command_log ORDER BY created_at DESC LIMIT $1",
-            limit,
-        )
+        args.append(asset_id)
+        conditions.append(f"asset_id = ${len(args)}::uuid")
+    if cursor:
+        try:
+            after_ts, after_id = decode_cursor(cursor)
+            after_id = UUID(str(after_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        args.extend([after_ts, after_id])
+        conditions.append(f"(created_at, id) < (${len(args) - 1}::timestamptz, ${len(args)}::uuid)")
+    args.append(limit + 1)
+    rows = await db.fetch(
+        f"SELECT id, asset_id, intent, issued_by, is_override, payload, result, created_at FROM audit.command_log "
+        f"WHERE {' AND '.join(conditions)} ORDER BY created_at DESC, id DESC LIMIT ${len(args)}",
+        *args,
+    )
+    cursor_out = next_cursor(rows, limit, "created_at")
+    rows = rows[:limit]
     items = [
         {
             "id": str(r["id"]),
@@ -147,4 +160,4 @@ async def list_audit(
         }
         for r in rows
     ]
-    return {"items": items, "total": len(items)}
+    return {"items": items, "total": len(items), "next_cursor": cursor_out}
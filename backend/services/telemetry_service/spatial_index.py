@@ -0,0 +1,147 @@
+"""
+Uniform-grid spatial index over the latest known asset positions (planar metres, as in simulator payloads).
+Moves are O(1); radius and bbox queries touch only the overlapping cells; k-nearest expands rings of
+cells outward from the query point and stops once no unvisited cell can hold a closer asset.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from typing import Any
+
+
+def parse_position(value: Any) -> tuple[float, float] | None:
+    """Accept [x, y], [x, y, z] or {"x": .., "y": ..}; None if not a usable 2D position."""
+    try:
+        if isinstance(value, dict):
+            x, y = float(value["x"]), float(value["y"])
+        elif isinstance(value, (list, tuple)) and len(value) >= 2:
+            x, y = float(value[0]), float(value[1])
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    return x, y
+
+
+class GridIndex:
+    """Thread-safe: updated from the telemetry consumer thread, queried from request handlers."""
+
+    def __init__(self, cell_size: float = 100.0) -> None:
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], dict[str, tuple[float, float]]] = {}
+        self._where: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def update(self, asset_id: str, x: float, y: float) -> None:
+        cell = self._cell(x, y)
+        with self._lock:
+            old = self._where.get(asset_id)
+            if old is not None and old != cell:
+                self._drop(asset_id, old)
+            self._cells.setdefault(cell, {})[asset_id] = (x, y)
+            self._where[asset_id] = cell
+
+    def remove(self, asset_id: str) -> None:
+        with self._lock:
+            cell = self._where.pop(asset_id, None)
+            if cell is not None:
+                self._drop(asset_id, cell)
+
+    def _drop(self, asset_id: str, cell: tuple[int, int]) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(asset_id, None)
+            if not members:
+                del self._cells[cell]
+
+    def bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> list[tuple[str, float, float]]:
+        """Assets inside the box (inclusive), as (asset_id, x, y)."""
+        cx0, cy0 = self._cell(min_x, min_y)
+        cx1, cy1 = self._cell(max_x, max_y)
+        out = []
+        with self._lock:
+            for cell in self._cells_in_range(cx0, cy0, cx1, cy1):
+                for aid, (x, y) in self._cells[cell].items():
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        out.append((aid, x, y))
+        return out
+
+    def radius(self, x: float, y: float, radius: float) -> list[tuple[str, float, float, float]]:
+        """Assets within radius of (x, y), nearest first, as (asset_id, x, y, distance)."""
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        r2 = radius * radius
+        out = []
+        with self._lock:
+            for cell in self._cells_in_range(cx0, cy0, cx1, cy1):
+                for aid, (px, py) in self._cells[cell].items():
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 <= r2:
+                        out.append((aid, px, py, math.sqrt(d2)))
+        out.sort(key=lambda t: t[3])
+        return out
+
+    def nearest(self, x: float, y: float, k: int, max_distance: float | None = None) -> list[tuple[str, float, float, float]]:
+        """The k assets closest to (x, y), nearest first, as (asset_id, x, y, distance)."""
+        if k <= 0:
+            return []
+        qx, qy = self._cell(x, y)
+        best: list[tuple[float, str, float, float]] = []  # max-heap on distance via negation
+        with self._lock:
+            if not self._cells:
+                return []
+            max_ring = max(max(abs(cx - qx), abs(cy - qy)) for cx, cy in self._cells)
+            ring = 0
+            while ring <= max_ring:
+                ring_cells = 8 * ring if ring else 1
+                if ring_cells > len(self._cells):
+                    # Sparse fleet: the remaining rings are mostly empty, check occupied cells directly.
+                    cells = [c for c in self._cells if max(abs(c[0] - qx), abs(c[1] - qy)) >= ring]
+                    ring = max_ring
+                else:
+                    cells = [c for c in self._ring(qx, qy, ring) if c in self._cells]
+                for cell in cells:
+                    for aid, (px, py) in self._cells[cell].items():
+                        d = math.hypot(px - x, py - y)
+                        if len(best) < k:
+                            heapq.heappush(best, (-d, aid, px, py))
+                        elif d < -best[0][0]:
+                            heapq.heapreplace(best, (-d, aid, px, py))
+                # Anything outside the visited rings is at least ring * cell_size away.
+                if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                    break
+                ring += 1
+        out = sorted(((aid, px, py, -nd) for nd, aid, px, py in best), key=lambda t: t[3])
+        if max_distance is not None:
+            out = [t for t in out if t[3] <= max_distance]
+        return out
+
+    def _cells_in_range(self, cx0: int, cy0: int, cx1: int, cy1: int):
+        span = (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+        if span > len(self._cells):
+            return [c for c in self._cells if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1]
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1) if (cx, cy) in self._cells]
+
+    @staticmethod
+    def _ring(qx: int, qy: int, ring: int):
+        if ring == 0:
+            yield qx, qy
+            return
+        for dx in range(-ring, ring + 1):
+            yield qx + dx, qy - ring
+            yield qx + dx, qy + ring
+        for dy in range(-ring + 1, ring):
+            yield qx - ring, qy + dy
+            yield qx + ring, qy + dy
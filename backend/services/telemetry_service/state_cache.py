@@ -0,0 +1,162 @@
+"""
+Latest known state per asset (position, velocity, heading, status, last_seen), fed from telemetry.raw.
+Lookups by asset_id are O(1); a region index keeps region-scoped listings proportional to the region.
+Memory is bounded: entries idle longer than ttl_seconds expire and the least recently updated asset
+is evicted once max_assets is reached, so churned assets do not accumulate.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+STATE_FIELDS = ("position", "velocity", "heading", "status")
+
+
+def _parse_ts(value: Any) -> datetime | None:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+class LatestStateCache:
+    """Thread-safe: the Kafka consumer thread writes while request handlers read."""
+
+    def __init__(
+        self,
+        max_assets: int = 50000,
+        ttl_seconds: float = 3600.0,
+        on_evict: Callable[[str], None] | None = None,
+    ) -> None:
+        self.max_assets = max_assets
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._last_ts: dict[str, datetime] = {}
+        self._touched: dict[str, float] = {}
+        self._by_region: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, point: dict[str, Any]) -> dict[str, Any] | None:
+        """Apply one telemetry point. Out-of-order points older than the stored state are ignored.
+        Returns the new state for the asset, or None if the point was ignored."""
+        asset_id = point.get("asset_id")
+        ts = _parse_ts(point.get("timestamp"))
+        if not asset_id or ts is None:
+            return None
+        asset_id = str(asset_id)
+        payload = point.get("payload") or {}
+        if not isinstance(payload, dict):
+            return None
+        with self._lock:
+            prev_ts = self._last_ts.get(asset_id)
+            if prev_ts is not None and ts < prev_ts:
+                return None
+            entry = self._entries.get(asset_id)
+            if entry is None:
+                entry = {"asset_id": asset_id, "region_id": None, **{f: None for f in STATE_FIELDS}}
+                self._entries[asset_id] = entry
+            for field in STATE_FIELDS:
+                if field in payload:
+                    entry[field] = payload[field]
+            region_id = payload.get("region_id")
+            if region_id and region_id != entry["region_id"]:
+                self._unindex(asset_id, entry["region_id"])
+                entry["region_id"] = str(region_id)
+                self._by_region.setdefault(entry["region_id"], set()).add(asset_id)
+            entry["source"] = point.get("source", entry.get("source"))
+            entry["last_seen"] = point["timestamp"]
+            self._last_ts[asset_id] = ts
+            self._touched[asset_id] = time.monotonic()
+            self._entries.move_to_end(asset_id)
+            while len(self._entries) > self.max_assets:
+                oldest, _ = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self.evictions += 1
+            return dict(entry)
+
+    def get(self, asset_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(asset_id)
+            if entry is None:
+                return None
+            if time.monotonic() - self._touched[asset_id] > self.ttl_seconds:
+                self._remove(asset_id)
+                self.evictions += 1
+                return None
+            return dict(entry)
+
+    def list(
+        self,
+        regions: list[str] | None = None,
+        region_id: str | None = None,
+        status: str | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        """Most recently updated first. regions restricts to an allowed set (None = unrestricted)."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            if region_id is not None or regions is not None:
+                wanted = [region_id] if region_id is not None else regions
+                if regions is not None and region_id is not None and region_id not in regions:
+                    return []
+                ids: set[str] = set()
+                for r in wanted or []:
+                    ids |= self._by_region.get(r, set())
+                candidates = sorted(ids, key=self._touched.__getitem__, reverse=True)
+            else:
+                candidates = reversed(self._entries)
+            out = []
+            for aid in candidates:
+                if self._touched[aid] < cutoff:
+                    # Entries are ordered by update time, so everything after this is older still.
+                    break
+                entry = self._entries[aid]
+                if status and entry.get("status") != status:
+                    continue
+                out.append(dict(entry))
+                if len(out) >= limit:
+                    break
+            return out
+
+    def evict_expired(self) -> int:
+        """Drop entries idle longer than ttl_seconds. Oldest entries sit at the front, so this stops early."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if self._touched[oldest] >= cutoff:
+                    break
+                self._remove(oldest)
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def _remove(self, asset_id: str) -> None:
+        entry = self._entries.pop(asset_id, None)
+        self._last_ts.pop(asset_id, None)
+        self._touched.pop(asset_id, None)
+        if entry is not None:
+            self._unindex(asset_id, entry.get("region_id"))
+            if self.on_evict is not None:
+                self.on_evict(asset_id)
+
+    def _unindex(self, asset_id: str, region_id: str | None) -> None:
+        if region_id is None:
+            return
+        members = self._by_region.get(region_id)
+        if members is not None:
+            members.discard(asset_id)
+            if not members:
+                del self._by_region[region_id]
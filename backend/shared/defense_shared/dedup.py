@@ -0,0 +1,92 @@
+"""
+Time-windowed, memory-bounded duplicate filter for at-least-once streams.
+A ring of Bloom filters ("generations"): keys are added to the newest generation and looked up in all
+of them. A new generation starts every window_seconds (or once the newest holds `capacity` keys) and
+the oldest is dropped, so memory is fixed at generations x m bits no matter how long the process runs.
+Duplicates are caught if they arrive within roughly (generations - 1) x window_seconds of the original.
+A false positive drops a genuine event, so keep error_rate small.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from typing import Any
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be >= 1 and 0 < error_rate < 1")
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes) -> list[int]:
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def contains_positions(self, positions: list[int]) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add_positions(self, positions: list[int]) -> None:
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter:
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 1e-4,
+        window_seconds: float = 600.0,
+        generations: int = 3,
+    ) -> None:
+        if generations < 2:
+            raise ValueError("generations must be >= 2")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self._gens = [BloomFilter(capacity, error_rate) for _ in range(generations)]
+        self._started = time.monotonic()
+        self.rotations = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(g.bits) for g in self._gens)
+
+    def _maybe_rotate(self, now: float) -> None:
+        newest = self._gens[-1]
+        if now - self._started >= self.window_seconds or newest.count >= self.capacity:
+            self._gens.pop(0)
+            self._gens.append(BloomFilter(self.capacity, self.error_rate))
+            self._started = now
+            self.rotations += 1
+
+    def seen_or_add(self, key: str | bytes, now: float | None = None) -> bool:
+        """True if key was (probably) seen within the window; otherwise records it and returns False."""
+        self._maybe_rotate(time.monotonic() if now is None else now)
+        data = key.encode("utf-8") if isinstance(key, str) else key
+        # All generations share size and hash count, so positions are computed once.
+        positions = self._gens[-1]._positions(data)
+        for g in self._gens:
+            if g.contains_positions(positions):
+                return True
+        self._gens[-1].add_positions(positions)
+        return False
+
+
+def telemetry_dedup_key(point: dict[str, Any]) -> str | None:
+    """Explicit message id when the producer sets one, else (asset_id, timestamp, source)."""
+    msg_id = point.get("message_id") or point.get("msg_id")
+    if msg_id:
+        return f"id:{msg_id}"
+    asset_id, timestamp = point.get("asset_id"), point.get("timestamp")
+    if not asset_id or not timestamp:
+        return None
+    return f"{asset_id}|{timestamp}|{point.get('source', 'kafka')}"
@@ -0,0 +1,42 @@
+"""
+Keyset (cursor) pagination helpers shared by list endpoints.
+A cursor is an opaque base64url token for the (timestamp, id) of the last row returned;
+the next page is fetched with a row comparison so deep pages cost the same as the first.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+MAX_CURSOR_LEN = 256
+
+
+def encode_cursor(ts: datetime, row_id: Any) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor."""
+    raw = json.dumps([ts.isoformat(), row_id if isinstance(row_id, int) else str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, Any]:
+    """Decode a cursor into (timestamp, id). Raises ValueError if malformed."""
+    if not cursor or len(cursor) > MAX_CURSOR_LEN:
+        raise ValueError("invalid cursor")
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        parsed = datetime.fromisoformat(ts)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(row_id, (int, str)) or isinstance(row_id, bool):
+        raise ValueError("invalid cursor")
+    return parsed, row_id
+
+
+def next_cursor(rows: list, limit: int, ts_key: str, id_key: str = "id") -> str | None:
+    """Cursor for the page after `rows`, which were fetched with LIMIT limit + 1. None on the last page."""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last[ts_key], last[id_key])
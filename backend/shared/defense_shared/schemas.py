@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from datetime import datetime
 from enum import Enum
 from typing import Any
+from uuid import UUID
 
 from pydantic import BaseModel, Field
 
@@ -94,6 +96,29 @@ class AlertCreate(BaseModel):
     metadata: dict[str, Any] = Field(default_factory=dict)
 
 
+class AlertBulkAction(str, Enum):
+    ACKNOWLEDGE = "acknowledge"
+    RESOLVE = "resolve"
+    ESCALATE = "escalate"
+
+
+class AlertBulkFilter(BaseModel):
+    region_id: str | None = None
+    class_name: str | None = None
+    severity: AlertSeverity | None = None
+    state: AlertState | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class AlertBulkUpdate(BaseModel):
+    """Exactly one of ids or filter selects the alerts."""
+    action: AlertBulkAction
+    ids: list[UUID] | None = Field(None, max_length=10000)
+    filter: AlertBulkFilter | None = None
+    user_id: UUID | None = None
+
+
 class CommandIntent(str, Enum):
     EMERGENCY_STOP = "emergency_stop"
     OVERRIDE = "override"
@@ -4,16 +4,32 @@ Maps to OWASP Top 10 mitigations (see docs/security/OWASP-TOP10.md).
 """
 from __future__ import annotations
 
+import hashlib
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from typing import Any
 
+try:
+    import jwt
+except ImportError:  # decode_jwt then rejects every token
+    jwt = None
+
 # JWT
 JWT_SECRET = os.getenv("JWT_SECRET", "")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ISSUER = os.getenv("JWT_ISSUER", "defense-api")
 JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "defense-dashboard")
 JWT_LEEWAY_SECONDS = 10
+# Verified tokens are remembered (by SHA-256 digest) until exp + leeway so repeat requests skip
+# signature and claim checks; 0 disables. Tokens without exp are re-verified after JWT_CACHE_MAX_TTL.
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+JWT_CACHE_MAX_TTL_SECONDS = 300
+# Tokens that failed verification are remembered (same digest, same size bound) for a short while,
+# so a client replaying a bad token does not cost a signature check per request.
+JWT_NEGATIVE_CACHE_TTL_SECONDS = 30
 
 # Max lengths for string inputs (A03 Injection / overflow)
 MAX_STRING_LEN = 2048
@@ -22,9 +38,19 @@ MAX_ISSUED_BY_LEN = 256
 
 # Allowed query parameter keys per endpoint (A01 Broken Access Control, A10 SSRF)
 ALLOWED_QUERY_ASSETS = frozenset({"region_id", "status", "asset_type", "limit", "offset"})
-ALLOWED_QUERY_TELEMETRY = frozenset({"asset_id", "region_id", "from_ts", "to_ts", "limit"})
-ALLOWED_QUERY_ALERTS = frozenset({"region_id", "state", "severity", "limit", "offset"})
-ALLOWED_QUERY_AUDIT = frozenset({"asset_id", "limit"})
+ALLOWED_QUERY_TELEMETRY = frozenset(
+    {"asset_id", "region_id", "from_ts", "to_ts", "limit", "cursor", "fields", "max_points"}
+)
+ALLOWED_QUERY_TELEMETRY_EXPORT = frozenset({"asset_id", "region_id", "from_ts", "to_ts", "format"})
+ALLOWED_QUERY_STATE = frozenset({"region_id", "status", "limit"})
+ALLOWED_QUERY_SPATIAL = frozenset(
+    {"x", "y", "radius_m", "min_x", "min_y", "max_x", "max_y", "k", "max_distance_m", "region_id", "limit"}
+)
+ALLOWED_QUERY_ALERTS = frozenset({"region_id", "state", "severity", "limit", "cursor"})
+ALLOWED_QUERY_ALERT_STREAM = frozenset({"region_id", "severity"})
+ALLOWED_QUERY_ALERT_SUMMARY = frozenset({"region_id"})
+ALLOWED_QUERY_OVERVIEW = frozenset({"region_id", "alerts_limit"})
+ALLOWED_QUERY_AUDIT = frozenset({"asset_id", "limit", "cursor"})
 
 # URL allowlist for inference image_url (A10 SSRF). Empty = disallow all URLs in prod.
 INFERENCE_ALLOWED_URL_PREFIXES = [
@@ -33,12 +59,43 @@ INFERENCE_ALLOWED_URL_PREFIXES = [
 ]
 
 
+_jwt_cache: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+_jwt_rejected: OrderedDict[bytes, float] = OrderedDict()  # digest -> time the rejection expires
+_jwt_cache_lock = threading.Lock()  # the gateway's sync auth dependency runs in a thread pool
+jwt_cache_stats = {"hits": 0, "misses": 0, "rejected_hits": 0}
+
+
+def clear_jwt_cache() -> None:
+    with _jwt_cache_lock:
+        _jwt_cache.clear()
+        _jwt_rejected.clear()
+
+
 def decode_jwt(token: str) -> dict | None:
-    """Decode and verify JWT. Returns payload dict or None if invalid."""
-    if not JWT_SECRET or len(JWT_SECRET) < 32:
+    """Decode and verify JWT. Returns payload dict or None if invalid.
+    A token verified before is answered from the cache until it expires; a token that failed is
+    rejected from the cache for JWT_NEGATIVE_CACHE_TTL_SECONDS."""
+    if not JWT_SECRET or len(JWT_SECRET) < 32 or jwt is None:
         return None
+    key = hashlib.sha256(token.encode()).digest() if JWT_CACHE_SIZE > 0 else None
+    if key is not None:
+        now = time.time()
+        with _jwt_cache_lock:
+            cached = _jwt_cache.get(key)
+            if cached is not None:
+                if now < cached[1]:
+                    _jwt_cache.move_to_end(key)
+                    jwt_cache_stats["hits"] += 1
+                    return dict(cached[0])
+                del _jwt_cache[key]
+            rejected = _jwt_rejected.get(key)
+            if rejected is not None:
+                if now < rejected:
+                    jwt_cache_stats["rejected_hits"] += 1
+                    return None
+                del _jwt_rejected[key]
+            jwt_cache_stats["misses"] += 1
     try:
-        import jwt
         payload = jwt.decode(
             token,
             JWT_SECRET,
@@ -47,9 +104,23 @@ def decode_jwt(token: str) -> dict | None:
             audience=JWT_AUDIENCE,
             leeway=JWT_LEEWAY_SECONDS,
         )
-        return payload
     except Exception:
+        if key is not None:
+            with _jwt_cache_lock:
+                _jwt_rejected[key] = time.time() + JWT_NEGATIVE_CACHE_TTL_SECONDS
+                while len(_jwt_rejected) > JWT_CACHE_SIZE:
+                    _jwt_rejected.popitem(last=False)
         return None
+    if key is not None:
+        now = time.time()
+        expires = now + JWT_CACHE_MAX_TTL_SECONDS
+        if isinstance(payload.get("exp"), (int, float)):
+            expires = min(expires, payload["exp"] + JWT_LEEWAY_SECONDS)
+        with _jwt_cache_lock:
+            _jwt_cache[key] = (dict(payload), expires)
+            while len(_jwt_cache) > JWT_CACHE_SIZE:
+                _jwt_cache.popitem(last=False)
+    return payload
 
 
 def sanitize_string(value: Any, max_len: int = MAX_STRING_LEN) -> str:
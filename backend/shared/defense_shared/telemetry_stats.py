@@ -0,0 +1,177 @@
+"""
+Per-bucket numeric statistics for telemetry aggregation.
+Events are buffered per (asset_id, bucket_ts, source); on flush each bucket's numeric payload fields
+are stacked into one NumPy matrix (events x fields, NaN where a field is missing) and
+count/min/max/mean/std are computed column-wise in a single vectorized pass.
+Stats are stored as {field: {"n", "min", "max", "mean", "std"}} in telemetry.aggregated.stats and
+merged in SQL (telemetry.merge_stats) when a bucket is flushed more than once.
+"""
+from __future__ import annotations
+
+import json
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+import numpy as np
+
+AXES = ("x", "y", "z")
+MAX_FIELDS = 64
+
+UPSERT_BUCKET_SQL = """
+    INSERT INTO telemetry.aggregated (asset_id, bucket_ts, source, count_events, payload_sample, stats)
+    VALUES ($1::uuid, $2::timestamptz, $3, $4, $5::jsonb, $6::jsonb)
+    ON CONFLICT (asset_id, bucket_ts, source) DO UPDATE
+    SET count_events = telemetry.aggregated.count_events + EXCLUDED.count_events,
+        payload_sample = EXCLUDED.payload_sample,
+        stats = telemetry.merge_stats(telemetry.aggregated.stats, EXCLUDED.stats)
+"""
+
+
+def asset_uuid(value: Any) -> str | None:
+    """Canonical UUID string for an asset id, or None. Bucket rows are upserted with a ::uuid cast,
+    so one malformed id would otherwise fail the whole batch."""
+    if not isinstance(value, (str, uuid.UUID)) or not value:
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def bucket_of(timestamp: Any) -> datetime | None:
+    """Minute bucket (UTC) for an ISO-8601 timestamp, or None if unparseable."""
+    if not isinstance(timestamp, str) or not timestamp:
+        return None
+    try:
+        ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def numeric_fields(payload: Any) -> dict[str, float]:
+    """Flatten the numeric parts of a payload: scalars by name, vectors as name.x/.y/.z, one level of nesting."""
+    out: dict[str, float] = {}
+    if not isinstance(payload, dict):
+        return out
+
+    def put(name: str, value: Any) -> None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        f = float(value)
+        if math.isfinite(f) and len(out) < MAX_FIELDS:
+            out[name] = f
+
+    for key, value in payload.items():
+        if isinstance(value, (list, tuple)):
+            for i, v in enumerate(value[: len(AXES)]):
+                put(f"{key}.{AXES[i]}", v)
+        elif isinstance(value, dict):
+            for sub, v in value.items():
+                put(f"{key}.{sub}", v)
+        else:
+            put(str(key), value)
+    return out
+
+
+def compute_stats(fields: list[str], matrix: np.ndarray) -> dict[str, dict[str, float]]:
+    """Column-wise stats over an (events x fields) matrix with NaN for missing values."""
+    if matrix.size == 0:
+        return {}
+    present = ~np.isnan(matrix)
+    n = present.sum(axis=0)
+    filled = np.where(present, matrix, 0.0)
+    safe_n = np.maximum(n, 1)
+    mean = filled.sum(axis=0) / safe_n
+    var = np.where(present, (matrix - mean) ** 2, 0.0).sum(axis=0) / safe_n
+    mins = np.where(present, matrix, np.inf).min(axis=0)
+    maxs = np.where(present, matrix, -np.inf).max(axis=0)
+    std = np.sqrt(var)
+    return {
+        name: {
+            "n": int(n[i]),
+            "min": float(mins[i]),
+            "max": float(maxs[i]),
+            "mean": float(mean[i]),
+            "std": float(std[i]),
+        }
+        for i, name in enumerate(fields)
+        if n[i] > 0
+    }
+
+
+class BucketAccumulator:
+    """Buffers raw events per bucket until drain(); not thread-safe (one per consumer loop)."""
+
+    def __init__(self) -> None:
+        self._values: dict[tuple[str, datetime, str], list[dict[str, float]]] = {}
+        self._counts: dict[tuple[str, datetime, str], int] = {}
+        self._samples: dict[tuple[str, datetime, str], Any] = {}
+        self.events = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, asset_id: str, timestamp: str, source: str, payload: Any) -> bool:
+        """Buffer one event. Returns False if the timestamp cannot be bucketed or asset_id is not a UUID."""
+        bucket = bucket_of(timestamp)
+        asset = asset_uuid(asset_id)
+        if bucket is None or asset is None:
+            return False
+        key = (asset, bucket, source)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._values.setdefault(key, []).append(numeric_fields(payload))
+        self._samples[key] = payload
+        self.events += 1
+        return True
+
+    def add_many(self, points: Iterable[dict[str, Any]], default_source: str = "kafka") -> int:
+        added = 0
+        for p in points:
+            if self.add(p.get("asset_id"), p.get("timestamp"), p.get("source", default_source), p.get("payload", {})):
+                added += 1
+        return added
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Compute stats for every buffered bucket and reset the buffer."""
+        rows = []
+        for key, count in self._counts.items():
+            events = self._values[key]
+            fields = sorted({f for e in events for f in e})
+            matrix = np.full((len(events), len(fields)), np.nan)
+            col = {f: i for i, f in enumerate(fields)}
+            for r, e in enumerate(events):
+                for f, v in e.items():
+                    matrix[r, col[f]] = v
+            rows.append({
+                "asset_id": key[0],
+                "bucket_ts": key[1],
+                "source": key[2],
+                "count_events": count,
+                "payload_sample": self._samples[key],
+                "stats": compute_stats(fields, matrix),
+            })
+        self._values.clear()
+        self._counts.clear()
+        self._samples.clear()
+        self.events = 0
+        return rows
+
+
+def upsert_args(rows: list[dict[str, Any]]) -> list[tuple]:
+    """Bind arguments for UPSERT_BUCKET_SQL, one tuple per drained bucket (for executemany)."""
+    return [
+        (
+            r["asset_id"],
+            r["bucket_ts"],
+            r["source"],
+            r["count_events"],
+            json.dumps(r["payload_sample"]),
+            json.dumps(r["stats"]),
+        )
+        for r in rows
+    ]
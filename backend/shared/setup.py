@@ -7,5 +7,6 @@ setup(
     install_requires=[
         "pydantic>=2.0",
         "python-dotenv>=1.0",
+        "numpy>=1.24",
     ],
 )
@@ -0,0 +1,314 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import uuid
+
+import pytest
+
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), "..", "services", "alert_service")
+sys.path.insert(0, SERVICE_DIR)
+
+# Loaded under its own name so it does not clash with the telemetry aggregator's "kafka_consumer".
+_spec = importlib.util.spec_from_file_location("alert_consumer", os.path.join(SERVICE_DIR, "kafka_consumer.py"))
+alert_consumer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(alert_consumer)
+
+
+def test_alert_rows_follow_default_rules_and_share_serialized_detection():
+    from rules import RuleEngine
+    from suppression import AlertSuppressor
+
+    payload = {
+        "detections": [
+            {"frame_id": 7, "class_name": "person", "confidence": 0.95, "asset_id": "11111111-1111-1111-1111-111111111111"},
+            {"frame_id": 8, "class_name": "car", "confidence": 0.2},
+            {"frame_id": 9, "class_name": "drone", "threat_score": 0.75, "asset_id": "not-a-uuid"},
+        ]
+    }
+    engine = RuleEngine(None, 0.7)
+    rows = alert_consumer.stage_batch(alert_consumer.detections_of(payload), engine, AlertSuppressor())
+    assert len(rows) == 2
+    cols = alert_consumer.ALERT_COLUMNS
+    first = dict(zip(cols, rows[0]))
+    assert first["severity"] == "high" and first["title"] == "Threat detected: person"
+    assert first["body"] is first["metadata"] and json.loads(first["body"])["frame_id"] == 7
+    assert first["asset_id"] == uuid.UUID("11111111-1111-1111-1111-111111111111")
+    assert first["detection_id"] == "7" and first["region_id"] is None
+    second = dict(zip(cols, rows[1]))
+    assert second["severity"] == "medium" and second["asset_id"] is None
+    assert first["id"] != second["id"]
+
+
+def test_suppression_folds_repeats_and_respects_bbox_overlap_and_window():
+    from suppression import AlertSuppressor
+
+    s = AlertSuppressor(window_seconds=30, max_keys=10, iou_threshold=0.5)
+    base = {"asset_id": "a1", "class_name": "person", "bbox": [0, 0, 10, 10]}
+    assert s.check(base, "alert-1", now=0) is None
+    assert s.check({**base, "bbox": [1, 1, 11, 11], "timestamp": "t2"}, "x", now=5) == "alert-1"
+    assert s.check({**base, "bbox": [50, 50, 60, 60]}, "alert-2", now=6) is None  # second person
+    assert s.check({**base, "class_name": "car"}, "alert-3", now=7) is None
+    assert s.check({**base, "bbox": [1, 1, 11, 11], "timestamp": "t3"}, "x", now=30) == "alert-1"
+    assert s.take_hits() == {"alert-1": (2, "t3")}
+    assert s.take_hits() == {}
+    assert s.check(base, "alert-4", now=61) is None  # window elapsed since last hit
+    assert s.suppressed == 2 and s.passed == 4
+    s.forget({"alert-4"})
+    assert s.check(base, "alert-5", now=62) is None
+
+
+def test_stage_batch_counts_suppressed_and_bounds_state():
+    from rules import RuleEngine
+    from suppression import AlertSuppressor
+
+    s = AlertSuppressor(window_seconds=60, max_keys=3)
+    dets = [{"asset_id": f"a{i % 5}", "class_name": "person", "confidence": 0.9} for i in range(20)]
+    rows = alert_consumer.stage_batch(dets, RuleEngine(None, 0.7), s)
+    assert len(s) <= 3
+    assert len(rows) == s.passed
+    assert s.suppression_ratio == s.suppressed / 20
+    assert "alert_consumer_suppression_ratio" in alert_consumer.render_metrics(s)
+
+
+class _AlertWriteDB:
+    """Alerts by id -> state; COPY inserts, the hit UPDATE skips resolved alerts like the real one."""
+
+    def __init__(self):
+        self.alerts = {}
+
+    def acquire(self):
+        return self
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def copy_records_to_table(self, table, schema_name, columns, records):
+        for r in records:
+            self.alerts[r[0]] = {"state": "new", "metadata": json.loads(r[columns.index("metadata")])}
+
+    async def fetch(self, sql, ids, hits, last_seen):
+        return [{"id": i} for i in ids if i in self.alerts and self.alerts[i]["state"] != "resolved"]
+
+
+@pytest.mark.asyncio
+async def test_hits_on_an_alert_resolved_before_the_write_become_a_new_alert():
+    from rules import RuleEngine
+    from suppression import AlertSuppressor
+
+    db = _AlertWriteDB()
+    engine = RuleEngine(None, 0.7)
+    s = AlertSuppressor(window_seconds=60)
+    det = {"asset_id": str(uuid.uuid4()), "class_name": "person", "confidence": 0.9}
+    rows = alert_consumer.stage_batch([det], engine, s)
+    assert await alert_consumer.write_batch(db, rows, s.take_hits()) == {}
+    first = rows[0][0]
+
+    folded = {}
+    repeats = [{**det, "frame_id": 2, "timestamp": "t2"}, {**det, "frame_id": 3, "timestamp": "t3"}]
+    assert alert_consumer.stage_batch(repeats, engine, s, folded) == []  # both fold into the open alert
+    db.alerts[first]["state"] = "resolved"  # an operator resolves it before the batch is written
+    closed = await alert_consumer.write_batch(db, [], s.take_hits(), folded)
+    new_id = closed[first]
+    assert new_id is not None and new_id != first
+    assert db.alerts[new_id]["metadata"]["frame_id"] == 2
+    assert db.alerts[new_id]["metadata"]["hit_count"] == 2 and db.alerts[new_id]["metadata"]["last_seen"] == "t3"
+
+    # Later repeats fold into the replacement alert.
+    s.replace(closed)
+    assert s.check({**det, "frame_id": 4}, uuid.uuid4()) == new_id
+
+
+def test_rules_match_each_dimension_first_rule_wins():
+    from rules import CompiledRules
+
+    rules = CompiledRules([
+        {"name": "night", "match": {"class_name": ["person"], "hours_utc": [22, 4]}, "severity": "critical",
+         "title": "{class_name} at night on {asset_id} ({confidence:.1f})"},
+        {"name": "region", "match": {"region_id": ["r1"], "asset_type": ["camera"], "confidence": {"min": 0.5, "max": 0.9}},
+         "severity": "high", "title": "{rule} {region_id}"},
+        {"name": "burst", "match": {"class_name": ["car"], "count_in_window": {"min": 3, "window_sec": 60}},
+         "severity": "low", "title": "{missing}"},
+    ])
+    base = {"asset_id": "a1", "confidence": 0.6}
+    out = rules.evaluate([
+        {**base, "class_name": "person", "timestamp": "2024-01-01T23:30:00Z"},
+        {**base, "class_name": "person", "timestamp": "2024-01-01T12:00:00Z"},
+        {**base, "class_name": "dog", "region_id": "r1", "asset_type": "camera"},
+        {**base, "class_name": "dog", "region_id": "r1", "asset_type": "camera", "confidence": 0.95},
+        {**base, "class_name": "car", "timestamp": "2024-01-01T12:00:00Z"},
+        {**base, "class_name": "car", "timestamp": "2024-01-01T12:00:30Z"},
+        {**base, "class_name": "car", "timestamp": "2024-01-01T12:00:59Z"},
+        {**base, "class_name": "car", "timestamp": "2024-01-01T12:02:30Z"},
+    ])
+    assert out[0] == ("night", "critical", "person at night on a1 (0.6)")
+    assert out[1] is None
+    assert out[2] == ("region", "high", "region r1")
+    assert out[3] is None
+    assert [o and o[0] for o in out[4:]] == [None, None, "burst", None]
+    assert out[6][2] == "unknown"
+
+
+def test_rule_engine_hot_reloads_and_keeps_rules_on_bad_file(tmp_path):
+    import os
+
+    from rules import RuleEngine
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [{"name": "any", "severity": "low", "title": "x"}]}))
+    engine = RuleEngine(str(path), 0.7, check_interval_sec=0)
+    assert engine.evaluate([{"confidence": 0.1}])[0][0] == "any"
+    path.write_text("{not json")
+    os.utime(path, (1, 1))
+    assert engine.evaluate([{"confidence": 0.1}])[0][0] == "any"
+    assert engine.reload_errors == 1
+    path.write_text(json.dumps([{"name": "strict", "match": {"confidence": {"min": 0.5}}, "severity": "high"}]))
+    os.utime(path, (2, 2))
+    assert engine.evaluate([{"confidence": 0.1}]) == [None]
+    assert engine.reloads == 2
+
+
+def test_rule_engine_reload_keeps_count_in_window_history(tmp_path):
+    import os
+
+    from rules import RuleEngine
+
+    def write(severity, mtime):
+        path.write_text(json.dumps([{"name": "burst", "severity": severity, "title": "x",
+                                     "match": {"class_name": ["car"], "count_in_window": {"min": 3, "window_sec": 60}}}]))
+        os.utime(path, (mtime, mtime))
+
+    path = tmp_path / "rules.json"
+    write("low", 1)
+    engine = RuleEngine(str(path), 0.7, check_interval_sec=0)
+    car = {"asset_id": "a1", "class_name": "car", "confidence": 0.9}
+    assert engine.evaluate([{**car, "timestamp": "2024-01-01T12:00:00Z"},
+                            {**car, "timestamp": "2024-01-01T12:00:20Z"}]) == [None, None]
+    write("high", 2)
+    assert engine.evaluate([{**car, "timestamp": "2024-01-01T12:00:40Z"}]) == [("burst", "high", "x")]
+    assert engine.reloads == 2
+
+class _AssetDB:
+    """Stands in for the pool: answers the asset lookups and records the ids each query asked for."""
+
+    def __init__(self, assets):
+        self.assets = assets
+        self.queries = []
+
+    async def fetch(self, sql, arg):
+        if "ANY" in sql:
+            self.queries.append(sorted(str(i) for i in arg))
+            return [{"id": i, **self.assets[i]} for i in arg if i in self.assets]
+        return [{"id": i, **a} for i, a in self.assets.items()][:arg]
+
+
+@pytest.mark.asyncio
+async def test_asset_cache_enriches_batches_with_one_query_and_honours_invalidation():
+    from asset_cache import AssetCache
+    from rules import RuleEngine
+    from suppression import AlertSuppressor
+
+    a, b, unknown = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db = _AssetDB({a: {"name": "Gate 1", "asset_type": "camera", "region_id": "north"}})
+    cache = AssetCache(ttl_seconds=60)
+    dets = [
+        {"frame_id": 1, "class_name": "person", "confidence": 0.9, "asset_id": str(a), "region_id": None},
+        {"frame_id": 2, "class_name": "person", "confidence": 0.9, "asset_id": str(unknown)},
+        {"frame_id": 3, "class_name": "person", "confidence": 0.9, "asset_id": str(a), "region_id": "own"},
+    ]
+    assert await cache.enrich(db, dets) == 2
+    assert db.queries == [sorted([str(a), str(unknown)])]
+    assert dets[0]["region_id"] == "north" and dets[0]["asset_type"] == "camera"
+    assert "region_id" not in dets[1] and dets[2]["region_id"] == "own"
+    rows = alert_consumer.stage_batch(dets[:1], RuleEngine(None, 0.7), AlertSuppressor())
+    assert dict(zip(alert_consumer.ALERT_COLUMNS, rows[0]))["region_id"] == "north"
+
+    # Known and unknown ids are both served from the cache now.
+    await cache.enrich(db, [{"asset_id": str(a)}, {"asset_id": str(unknown)}])
+    assert len(db.queries) == 1 and cache.hits == 2 and cache.misses == 2
+
+    db.assets[a]["region_id"] = "south"
+    cache.invalidate(str(a))
+    cache.invalidate(str(b))  # not cached: no-op
+    again = [{"asset_id": str(a)}]
+    await cache.enrich(db, again)
+    assert again[0]["region_id"] == "south" and db.queries[-1] == [str(a)] and cache.invalidations == 1
+    text = alert_consumer.render_metrics(AlertSuppressor(), None, cache)
+    assert "alert_consumer_asset_cache_hit_ratio 0.4" in text
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_filters_by_region_and_severity_and_drops_slow_subscribers():
+    import alert_stream
+
+    b = alert_stream.AlertBroadcaster("postgresql://unused")
+    b._task = asyncio.get_running_loop().create_future()  # no LISTEN connection in this test
+    scoped = b.subscribe(["r1"], None)
+    high = b.subscribe(None, {"high", "critical"})
+    b.publish({"id": "1", "severity": "high", "region_id": "r2"})
+    b.publish({"id": "2", "severity": "low", "region_id": "r1"})
+    assert scoped.queue.get_nowait()["id"] == "2" and scoped.queue.empty()
+    assert high.queue.get_nowait()["id"] == "1" and high.queue.empty()
+    for i in range(alert_stream.QUEUE_SIZE + 1):
+        b.publish({"id": str(i), "severity": "high", "region_id": "r9"})
+    assert high.dropped and high not in b.subscribers and b.slow_drops == 1
+    assert high.queue.get_nowait() is alert_stream.CLOSED
+    assert scoped in b.subscribers
+    b._task.cancel()
+
+
+class _EscalationDB:
+    """Alerts by id -> state; UPDATE escalates the given ids that are still new."""
+
+    def __init__(self, states):
+        self.states = states
+        self.updates = []
+
+    async def fetch(self, sql, target, ids, from_state):
+        self.updates.append(list(ids))
+        changed = [i for i in ids if self.states.get(i) == from_state]
+        for i in changed:
+            self.states[i] = target
+        return [{"id": i} for i in changed]
+
+
+@pytest.mark.asyncio
+async def test_escalation_scheduler_orders_deadlines_cancels_and_notifies_changed_only():
+    import time
+    from datetime import datetime, timezone
+    from escalation import EscalationScheduler
+
+    sched = EscalationScheduler({"critical": 0.05, "high": 10, "info": 0})
+    now = time.time()
+    created = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    assert sched.schedule("z", "unknown", now) is False and sched.schedule("z", "high", "not a time") is False
+    sched.on_change({"id": "a", "state": "new", "severity": "high", "created_at": created})
+    sched.on_change({"id": "b", "state": "new", "severity": "critical", "created_at": created})
+    sched.on_change({"id": "c", "state": "new", "severity": "critical", "created_at": created})
+    sched.on_change({"id": "d", "state": "new", "severity": "info", "created_at": created})
+    assert len(sched) == 3
+    sched.on_change({"id": "c", "state": "acknowledged", "severity": "critical"})
+    assert len(sched) == 2 and sched.pop_due(now) == []
+    assert sched.pop_due(now + 1) == ["b"] and sched.next_deadline() == pytest.approx(now + 10, abs=0.01)
+
+    db = _EscalationDB({"b": "new", "e": "new", "f": "acknowledged"})
+    sent = []
+
+    async def notify(ids):
+        sent.extend(ids)
+
+    sched.on_change({"id": "e", "state": "new", "severity": "critical", "created_at": created})
+    sched.on_change({"id": "f", "state": "new", "severity": "critical", "created_at": created})
+    task = asyncio.create_task(sched.run(db, notify))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    assert db.updates == [["e", "f"]]
+    assert sent == ["e"] and db.states["e"] == "escalated" and sched.escalated == 1
+    assert len(sched) == 1  # only "a" (high, 10s) is still pending
@@ -40,3 +40,335 @@ async def test_assets_with_bearer():
         )
         # May be 200 (if asset service is mocked) or 502/503 when service down
         assert r.status_code in (200, 502, 503)
+
+
+@pytest.mark.asyncio
+async def test_alert_stream_requires_auth():
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+    ) as client:
+        r = await client.get("/api/v1/alerts/stream")
+        assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_alert_summary_requires_auth():
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+    ) as client:
+        r = await client.get("/api/v1/alerts/summary")
+        assert r.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_alert_bulk_requires_auth_and_one_selector(monkeypatch):
+    monkeypatch.setenv("ALLOW_DEV_TOKEN", "true")
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+    ) as client:
+        r = await client.post("/api/v1/alerts/bulk", json={"action": "resolve", "ids": []})
+        assert r.status_code == 401
+        auth = {"Authorization": "Bearer dev-token"}
+        r = await client.post("/api/v1/alerts/bulk", json={"action": "resolve"}, headers=auth)
+        assert r.status_code == 400
+        r = await client.post("/api/v1/alerts/bulk", json={"action": "delete", "ids": []}, headers=auth)
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_each_request_verifies_its_token_once(monkeypatch):
+    import time
+    import jwt
+    from defense_shared import security
+
+    monkeypatch.setattr(security, "JWT_SECRET", "s" * 40)
+    monkeypatch.setattr(security, "JWT_CACHE_SIZE", 0)
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    claims = {"sub": "u1", "iss": security.JWT_ISSUER, "aud": security.JWT_AUDIENCE, "exp": int(time.time()) + 60}
+    good = jwt.encode(claims, "s" * 40, algorithm="HS256")
+    bad = jwt.encode(claims, "x" * 40, algorithm="HS256")
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+    ) as client:
+        r = await client.get("/api/v1/assets", headers={"Authorization": f"Bearer {bad}"})
+        assert r.status_code == 401
+        assert calls == [bad]
+        r = await client.post("/api/v1/alerts/bulk", json={"action": "resolve"}, headers={"Authorization": f"Bearer {good}"})
+        assert r.status_code == 400
+        assert calls == [bad, good]
+
+@pytest.mark.asyncio
+async def test_metrics_report_upstream_pools():
+    import main
+
+    main.upstream.start()
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+    ) as client:
+        r = await client.get("/metrics")
+        assert r.status_code == 200
+        assert 'gateway_upstream_max_connections{upstream="alert",pool="default"} 100' in r.text
+        assert "# TYPE gateway_upstream_in_flight gauge" in r.text
+    await main.upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_response_cache_isolates_regions_revalidates_stale_and_bounds_bytes():
+    import asyncio
+    from response_cache import ResponseCache, cache_key
+
+    calls = []
+
+    def loader(body):
+        async def load():
+            calls.append(body)
+            return 200, body
+        return load
+
+    north = {"role": "local_operator", "region_ids": ["n", "e"]}
+    north_again = {"role": "local_operator", "region_ids": ["e", "n"]}
+    south = {"role": "local_operator", "region_ids": ["s"]}
+    assert cache_key("/a", {"x": "1", "y": "2"}, north) == cache_key("/a", {"y": "2", "x": "1"}, north_again)
+    assert cache_key("/a", {}, north) != cache_key("/a", {}, south)
+    assert cache_key("/a", {}, {"role": "super_admin", "region_ids": ["n"]}) == cache_key("/a", {}, {"role": "super_admin"})
+
+    cache = ResponseCache(max_bytes=800)
+    key = cache_key("/a", {}, north)
+    assert await cache.get(key, "assets", 60, 60, loader(b"n1")) == (200, b"n1", "MISS")
+    assert await cache.get(key, "assets", 60, 60, loader(b"n2")) == (200, b"n1", "HIT")
+    assert (await cache.get(cache_key("/a", {}, south), "assets", 60, 60, loader(b"s1")))[1] == b"s1"
+
+    # ttl 0: served stale, refreshed once in the background however many stale hits arrive.
+    stale_key = cache_key("/t", {}, north)
+    await cache.get(stale_key, "telemetry", 0, 60, loader(b"t1"))
+    results = [await cache.get(stale_key, "telemetry", 0, 60, loader(b"t2")) for _ in range(3)]
+    assert all(r == (200, b"t1", "STALE") for r in results)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert calls.count(b"t2") == 1 and cache.revalidations == 1
+    assert (await cache.get(stale_key, "telemetry", 0, 60, loader(b"t3")))[1] == b"t2"
+
+    assert cache.invalidate("assets") == 2 and len(cache) == 1
+    for i in range(10):
+        await cache.get(cache_key("/b", {"i": str(i)}, north), "assets", 60, 60, loader(bytes(90)))
+    assert cache.bytes <= 800 and cache.evictions > 0
+    assert (await cache.get(cache_key("/b", {"i": "9"}, north), "assets", 60, 60, loader(b"")))[2] == "HIT"
+
+
+@pytest.mark.asyncio
+async def test_middleware_adds_headers_and_streams_without_buffering():
+    import asyncio
+    from starlette.responses import StreamingResponse
+    from middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+
+    release = asyncio.Event()
+
+    async def body():
+        yield b"first"
+        await release.wait()
+        yield b"second"
+
+    async def inner(scope, receive, send):
+        await StreamingResponse(body(), media_type="text/event-stream")(scope, receive, send)
+
+    stack = SecurityHeadersMiddleware(RateLimitMiddleware(inner, max_requests=5))
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body") == b"first":
+            # The first chunk reached the client while the generator is still blocked.
+            release.set()
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    scope = {"type": "http", "method": "GET", "path": "/s", "headers": [], "client": ("10.9.9.1", 1)}
+    await asyncio.wait_for(stack(scope, receive, send), timeout=2)
+    headers = dict(sent[0]["headers"])
+    assert headers[b"x-content-type-options"] == b"nosniff"
+    assert headers[b"x-ratelimit-limit"] == b"5" and headers[b"x-ratelimit-remaining"] == b"4"
+    assert [m.get("body") for m in sent[1:] if m.get("body")] == [b"first", b"second"]
+
+    for _ in range(5):
+        sent.clear()
+        await stack(scope, receive, send)
+    assert sent[0]["status"] == 429 and dict(sent[0]["headers"])[b"x-frame-options"] == b"DENY"
+
+
+def test_local_token_buckets_refill_and_stay_bounded():
+    from rate_limit import LocalBucketStore
+
+    store = LocalBucketStore(max_keys=3)
+    ip, user = ("ip:a", 3, 1.0), ("user:u", 2, 1.0)
+    assert store.acquire_sync([ip], now=0) == (True, 2, 0.0)
+    assert store.acquire_sync([ip, user], now=0)[:2] == (True, 1)
+    # The user bucket still has a token but the IP bucket does not: nothing is charged.
+    store.acquire_sync([ip], now=0)
+    allowed, _, retry_after = store.acquire_sync([ip, user], now=0)
+    assert not allowed and retry_after == 1.0
+    assert store.acquire_sync([user], now=0)[:2] == (True, 0)
+    assert store.acquire_sync([ip], now=1.5)[0]  # refilled 1.5 tokens
+
+    for i in range(5):
+        store.acquire_sync([(f"ip:{i}", 3, 1.0)], now=2)
+    assert len(store) == 3 and store.evictions == 4
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_user_route_buckets_and_shared_backend_fallback():
+    import asyncio
+    from rate_limit import LocalBucketStore, RateLimiter, RedisBucketStore
+
+    limiter = RateLimiter(window=60, ip_max=100, user_max=3, route_limits={"/api/v1/control/": 1})
+    assert [b[0] for b in limiter.buckets("1.1.1.1", "/api/v1/control/commands", "u1")] == [
+        "ip:1.1.1.1", "user:u1", "route:/api/v1/control/:u1",
+    ]
+    assert (await limiter.check("1.1.1.1", "/api/v1/control/commands", "u1")).allowed
+    denied = await limiter.check("2.2.2.2", "/api/v1/control/commands", "u1")
+    assert not denied.allowed and denied.limit == 1 and denied.retry_after > 0
+    # The same user from another address shares the user bucket.
+    assert (await limiter.check("3.3.3.3", "/api/v1/assets", "u1")).remaining == 1
+
+    class ScriptClient:
+        """Stands in for redis.asyncio: runs the bucket algorithm locally, returns Redis-typed replies."""
+
+        def __init__(self):
+            self.calls = []
+            self.attempts = 0
+            self.fail = False
+            self.local = LocalBucketStore()
+
+        def register_script(self, source):
+            async def run(keys, args):
+                self.attempts += 1
+                if self.fail:
+                    raise ConnectionError("redis down")
+                self.calls.append((keys, args))
+                caps = [float(a) for a in args]
+                ok, remaining, retry = self.local.acquire_sync(list(zip(keys, caps[::2], caps[1::2])))
+                return [int(ok), remaining, str(retry).encode()]
+            return run
+
+    client = ScriptClient()
+    shared = RateLimiter(window=60, ip_max=2, route_limits={}, store=RedisBucketStore(client), backend_backoff=0.05)
+    assert (await shared.check("9.9.9.9", "/x")).remaining == 1
+    assert client.calls[0] == (["ratelimit:ip:9.9.9.9"], ["2.0", repr(2 / 60)])
+    await shared.check("9.9.9.9", "/x")
+    assert not (await shared.check("9.9.9.9", "/x")).allowed
+
+    client.fail = True
+    assert (await shared.check("9.9.9.9", "/x")).allowed  # limited by the local store instead
+    assert shared.backend_errors == 1 and shared.rejected == 1
+    assert "gateway_rate_limit_backend_errors_total 1" in shared.render_metrics()
+    # Backing off: the next requests do not wait on the failed backend at all.
+    attempts = client.attempts
+    await shared.check("8.8.8.8", "/x")
+    assert client.attempts == attempts and shared.backend_skipped == 1
+    client.fail = False
+    await asyncio.sleep(0.06)
+    await shared.check("8.8.8.8", "/x")
+    assert client.attempts == attempts + 1 and client.calls[-1][0] == ["ratelimit:ip:8.8.8.8"]
+
+
+@pytest.mark.asyncio
+async def test_coalescer_shares_results_errors_and_cancellation():
+    import asyncio
+    from coalesce import RequestCoalescer
+
+    coalescer = RequestCoalescer(enabled=True)
+    calls = []
+    gate = asyncio.Event()
+
+    async def call(result):
+        calls.append(result)
+        await gate.wait()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    waiters = [asyncio.create_task(coalescer.do("k", "/a", lambda: call("one"))) for _ in range(5)]
+    other = asyncio.create_task(coalescer.do("other", "/a", lambda: call("two")))
+    await asyncio.sleep(0)
+    waiters[0].cancel()  # one client leaving does not cancel the shared call
+    gate.set()
+    assert await asyncio.gather(*waiters[1:], other) == ["one"] * 4 + ["two"]
+    assert calls == ["one", "two"] and len(coalescer) == 0
+    assert coalescer.leaders["/a"] == 2 and coalescer.followers["/a"] == 4
+
+    failing = [coalescer.do("k", "/b", lambda: call(ValueError("upstream down"))) for _ in range(3)]
+    results = await asyncio.gather(*failing, return_exceptions=True)
+    assert all(isinstance(e, ValueError) for e in results) and coalescer.errors["/b"] == 1
+
+    gate.clear()
+    abandoned = [asyncio.create_task(coalescer.do("k", "/c", lambda: call("late"))) for _ in range(2)]
+    await asyncio.sleep(0)
+    for t in abandoned:
+        t.cancel()
+    await asyncio.gather(*abandoned, return_exceptions=True)
+    assert coalescer.abandoned["/c"] == 1 and len(coalescer) == 0
+    gate.set()
+    assert await coalescer.do("k", "/c", lambda: call("fresh")) == "fresh"
+    assert 'gateway_coalesce_ratio{route="/a"} 0.6667' in coalescer.render_metrics()
+
+
+@pytest.mark.asyncio
+async def test_overview_fans_out_concurrently_and_returns_partial_results(monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    import main
+
+    monkeypatch.setenv("ALLOW_DEV_TOKEN", "true")
+    monkeypatch.setattr(main, "OVERVIEW_DEADLINE_SEC", 0.5)
+    main.response_cache.invalidate()
+    seen = []
+
+    async def handler(request):
+        seen.append((request.url.path, dict(request.url.params)))
+        if request.url.path == "/state":
+            await asyncio.sleep(5)
+        if request.url.path == "/alerts/summary":
+            return httpx.Response(503)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"items": [{"path": request.url.path}], "total": 1})
+
+    clients = {}
+
+    def get(service, stream=False):
+        return clients.setdefault(service, httpx.AsyncClient(
+            base_url=f"http://{service}", transport=httpx.MockTransport(handler)))
+
+    monkeypatch.setattr(main.upstream, "get", get)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        auth = {"Authorization": "Bearer dev-token"}
+        t0 = time.monotonic()
+        r = await client.get("/api/v1/overview?region_id=north&alerts_limit=5", headers=auth)
+        elapsed = time.monotonic() - t0
+        assert r.status_code == 200
+        body = r.json()
+        sections = body["sections"]
+        assert body["partial"] is True
+        assert sections["assets"]["status"] == "ok" and sections["alerts"]["data"]["total"] == 1
+        assert sections["alert_summary"] == {"status": "error", "detail": "Upstream returned 503",
+                                             "ms": sections["alert_summary"]["ms"]}
+        assert sections["telemetry_state"]["status"] == "timeout"
+        # Two 0.2 s sections and a 5 s one: bounded by the deadline, not the sum.
+        assert elapsed < 1.5
+        assert ("/alerts", {"region_id": "north", "limit": "5"}) in seen
+        assert (await client.get("/api/v1/overview?alerts_limit=x", headers=auth)).status_code == 400
+        assert main.overview_sections[("telemetry_state", "timeout")] >= 1
+    for c in clients.values():
+        await c.aclose()
@@ -0,0 +1,57 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from celery_app.backfill import aggregate_shard, check_range, parse_ts, plan_shards
+
+A1 = "0b6f5c1a-3d2e-4f10-9a8b-7c6d5e4f3a21"
+A2 = "0b6f5c1a-3d2e-4f10-9a8b-7c6d5e4f3a22"
+
+
+def test_plan_shards_minute_aligned_windows_per_partition():
+    shards = plan_shards(parse_ts("2024-01-01T00:00:30Z"), parse_ts("2024-01-01T02:15:00Z"), [0, 1], 60)
+    assert len(shards) == 6
+    assert shards[0] == (0, datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc), datetime(2024, 1, 1, 1, 0, tzinfo=timezone.utc))
+    assert shards[-1][2] == datetime(2024, 1, 1, 2, 15, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        plan_shards(parse_ts("2024-01-01T01:00:00Z"), parse_ts("2024-01-01T00:00:00Z"), [0], 60)
+
+
+def test_aggregate_shard_keeps_only_window_and_asset_set():
+    events = [
+        {"asset_id": A1, "timestamp": "2024-01-01T00:59:59Z", "payload": {"v": 1}},
+        {"asset_id": A1, "timestamp": "2024-01-01T01:00:00Z", "payload": {"v": 2}},
+        {"asset_id": A1, "timestamp": "2024-01-01T01:00:30Z", "payload": {"v": 4}},
+        {"asset_id": A2, "timestamp": "2024-01-01T01:00:10Z", "payload": {"v": 8}},
+        {"asset_id": A1, "timestamp": "2024-01-01T02:00:00Z", "payload": {"v": 16}},
+    ]
+    rows, used = aggregate_shard(events, parse_ts("2024-01-01T01:00:00Z"), parse_ts("2024-01-01T02:00:00Z"), {A1})
+    assert used == 2
+    assert len(rows) == 1
+    assert rows[0]["count_events"] == 2
+    assert rows[0]["stats"]["v"]["mean"] == 3.0
+
+
+def test_check_range_refuses_jobs_that_would_rebuild_from_nothing_or_race_the_live_path():
+    now = parse_ts("2024-01-01T12:00:00Z")
+    check_range(parse_ts("2024-01-01T11:00:00Z"), [0, 1], now=now)
+    with pytest.raises(ValueError, match="no partitions"):
+        check_range(parse_ts("2024-01-01T11:00:00Z"), [], now=now)
+    with pytest.raises(ValueError, match="still live"):
+        check_range(parse_ts("2024-01-01T11:59:00Z"), [0], now=now)
+
+
+def test_aggregate_shard_drops_redelivered_records_like_the_live_aggregator():
+    first = {"asset_id": A1, "timestamp": "2024-01-01T01:00:01Z", "source": "edge", "payload": {"v": 1}}
+    second = {**first, "timestamp": "2024-01-01T01:00:02Z", "payload": {"v": 3}}
+    by_id = {"asset_id": A1, "timestamp": "2024-01-01T01:00:03Z", "source": "edge", "message_id": "m1", "payload": {"v": 5}}
+    # Redelivery after a rebalance replays records; a different source is a different event.
+    events = [first, second, first, by_id, {**by_id, "timestamp": "2024-01-01T01:00:04Z"}, {**first, "source": "radar"}]
+    rows, used = aggregate_shard(events, parse_ts("2024-01-01T01:00:00Z"), parse_ts("2024-01-01T02:00:00Z"))
+    assert used == 4
+    edge = next(r for r in rows if r["source"] == "edge")
+    assert edge["count_events"] == 3
+    assert edge["stats"]["v"]["mean"] == 3.0
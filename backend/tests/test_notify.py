@@ -0,0 +1,128 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from celery_app import notify
+
+ALERTS = [
+    {"id": "a1", "severity": "medium", "title": "Threat detected: person", "state": "new", "region_id": "north",
+     "asset_id": None, "source": "inference", "created_at": "2024-01-01T00:00:00+00:00"},
+    {"id": "a2", "severity": "critical", "title": "Night intrusion", "state": "new", "region_id": "north",
+     "asset_id": None, "source": "inference", "created_at": "2024-01-01T00:00:05+00:00"},
+]
+
+
+class _Hook(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    received: list = []
+    peers: set = set()
+    status = 200
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).received.append(body)
+        type(self).peers.add(self.client_address)
+        self.send_response(type(self).status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Smtp(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, NOOP, QUIT."""
+
+    messages: list = []
+
+    def handle(self):
+        self.wfile.write(b"220 stand-in\r\n")
+        while line := self.rfile.readline():
+            cmd = line.strip().upper()
+            if cmd.startswith(b"EHLO") or cmd.startswith(b"HELO"):
+                self.wfile.write(b"250 ok\r\n")
+            elif cmd == b"DATA":
+                self.wfile.write(b"354 go\r\n")
+                data = b""
+                while (chunk := self.rfile.readline()) != b".\r\n":
+                    data += chunk
+                type(self).messages.append(data)
+                self.wfile.write(b"250 queued\r\n")
+            elif cmd == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+@pytest.fixture
+def webhook():
+    _Hook.received, _Hook.peers, _Hook.status = [], set(), 200
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Hook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/hook"
+    server.shutdown()
+    notify._http_client = None
+
+
+def test_routes_by_channel_severity_and_region():
+    dests = [
+        {"name": "hook", "type": "webhook", "url": "http://x", "severities": ["critical"]},
+        {"name": "mail", "type": "email", "to": ["a@b"], "regions": ["south"]},
+        {"name": "all-mail", "type": "email", "to": ["a@b"]},
+    ]
+    assert [d["name"] for d in notify.routes_for(ALERTS[1], dests)] == ["hook", "all-mail"]
+    assert [d["name"] for d in notify.routes_for(ALERTS[1], dests, "email")] == ["all-mail"]
+    assert notify.routes_for(ALERTS[0], dests, "webhook") == []
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [notify.backoff_delay(10, base=1, cap=30) for _ in range(200)]
+    assert all(0 <= d <= 30 for d in delays)
+    assert len(set(delays)) > 100
+
+
+def test_webhook_digest_reuses_connection_and_classifies_errors(webhook):
+    dest = {"name": "hook", "type": "webhook", "url": webhook}
+    notify.deliver(dest, ALERTS)
+    notify.deliver(dest, ALERTS[:1])
+    assert len(_Hook.received) == 2
+    assert len(_Hook.peers) == 1  # keep-alive: both digests over one connection
+    assert json.loads(_Hook.received[0])["count"] == 2
+    _Hook.status = 503
+    with pytest.raises(notify.DeliveryError) as e:
+        notify.deliver(dest, ALERTS)
+    assert e.value.retryable
+    _Hook.status = 404
+    with pytest.raises(notify.DeliveryError) as e:
+        notify.deliver(dest, ALERTS)
+    assert not e.value.retryable
+
+
+def test_email_digest_over_one_smtp_session(monkeypatch):
+    _Smtp.messages = []
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Smtp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(notify, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(notify, "SMTP_PORT", server.server_address[1])
+    try:
+        dest = {"name": "soc", "type": "email", "to": ["soc@example.org"]}
+        notify.deliver(dest, ALERTS)
+        session = notify._smtp
+        notify.deliver(dest, ALERTS[:1])
+        assert notify._smtp is session
+        assert len(_Smtp.messages) == 2
+        assert b"Subject: [CRITICAL] 2 alerts" in _Smtp.messages[0]
+        assert b"Night intrusion" in _Smtp.messages[0] and b"Threat detected: person" in _Smtp.messages[0]
+    finally:
+        if notify._smtp is not None:
+            notify._smtp.close()
+        notify._smtp = None
+        server.shutdown()
+        server.server_close()
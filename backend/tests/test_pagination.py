@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from defense_shared.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    assert decode_cursor(encode_cursor(ts, "5f0c..."))[1] == "5f0c..."
+
+
+@pytest.mark.parametrize("bad", ["", "not-base64!", "W10", "x" * 300])
+def test_decode_cursor_rejects_garbage(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+
+
+def test_next_cursor_only_when_more_rows():
+    ts = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [{"created_at": ts, "id": i} for i in range(3)]
+    assert next_cursor(rows, 3, "created_at") is None
+    assert decode_cursor(next_cursor(rows, 2, "created_at")) == (ts, 1)
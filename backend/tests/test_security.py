@@ -0,0 +1,62 @@
+import time
+
+import jwt
+import pytest
+
+from defense_shared import security
+
+SECRET = "s" * 40
+
+
+@pytest.fixture
+def jwt_env(monkeypatch):
+    monkeypatch.setattr(security, "JWT_SECRET", SECRET)
+    monkeypatch.setattr(security, "JWT_CACHE_SIZE", 2)
+    security.clear_jwt_cache()
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    yield calls
+    security.clear_jwt_cache()
+
+
+def _token(sub, exp_in=3600, secret=SECRET):
+    claims = {"sub": sub, "iss": security.JWT_ISSUER, "aud": security.JWT_AUDIENCE, "exp": int(time.time()) + exp_in}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def test_verified_tokens_are_cached_until_exp_plus_leeway(jwt_env, monkeypatch):
+    calls = jwt_env
+    token = _token("u1", exp_in=60)
+    assert security.decode_jwt(token)["sub"] == "u1"
+    payload = security.decode_jwt(token)
+    assert payload["sub"] == "u1" and len(calls) == 1
+    payload["sub"] = "tampered"  # callers get a copy
+    assert security.decode_jwt(token)["sub"] == "u1"
+
+    now = time.time()
+    monkeypatch.setattr(security.time, "time", lambda: now + 60 + security.JWT_LEEWAY_SECONDS + 1)
+    # Past exp + leeway by the cache's clock the entry is gone and the token is verified again.
+    security.decode_jwt(token)
+    assert len(calls) == 2
+
+
+def test_failures_are_cached_briefly_and_cache_is_bounded(jwt_env, monkeypatch):
+    calls = jwt_env
+    forged = _token("u1", secret="x" * 40)
+    assert security.decode_jwt(forged) is None and security.decode_jwt(forged) is None
+    assert len(calls) == 1
+    now = time.time()
+    monkeypatch.setattr(security.time, "time", lambda: now + security.JWT_NEGATIVE_CACHE_TTL_SECONDS + 1)
+    assert security.decode_jwt(forged) is None
+    assert len(calls) == 2
+    tokens = [_token(f"u{i}") for i in range(3)]
+    for t in tokens:
+        security.decode_jwt(t)
+    security.decode_jwt(tokens[0])  # evicted by the third token
+    assert len(calls) == 6
@@ -0,0 +1,328 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), "..", "services", "telemetry_service")
+sys.path.insert(0, SERVICE_DIR)
+from state_cache import LatestStateCache
+
+# Loaded under its own name so it does not clash with the other services' "main" modules.
+_spec = importlib.util.spec_from_file_location("telemetry_main", os.path.join(SERVICE_DIR, "main.py"))
+telemetry_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(telemetry_main)
+_spec = importlib.util.spec_from_file_location("telemetry_aggregator", os.path.join(SERVICE_DIR, "kafka_consumer.py"))
+telemetry_aggregator = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(telemetry_aggregator)
+
+
+ASSET_1 = "5f0c6d1e-8b7a-4c3d-9e2f-1a2b3c4d5e6f"
+
+
+def _point(asset_id, ts, **payload):
+    return {"asset_id": asset_id, "timestamp": ts, "source": "simulator", "payload": payload}
+
+
+def test_state_cache_keeps_latest_and_ignores_out_of_order():
+    cache = LatestStateCache()
+    cache.update(_point("a1", "2024-01-01T00:00:05Z", position=[5, 0, 10], status="in_mission", region_id="r1"))
+    cache.update(_point("a1", "2024-01-01T00:00:01Z", position=[1, 0, 10]))
+    cache.update(_point("a1", "2024-01-01T00:00:06Z", heading=90.0))
+    state = cache.get("a1")
+    assert state["position"] == [5, 0, 10]
+    assert state["heading"] == 90.0
+    assert state["status"] == "in_mission"
+    assert state["last_seen"] == "2024-01-01T00:00:06Z"
+
+
+def test_state_cache_region_filter_and_bounded_size():
+    cache = LatestStateCache(max_assets=2)
+    cache.update(_point("a1", "2024-01-01T00:00:00Z", region_id="r1"))
+    cache.update(_point("a2", "2024-01-01T00:00:00Z", region_id="r2"))
+    cache.update(_point("a3", "2024-01-01T00:00:00Z", region_id="r1"))
+    assert len(cache) == 2
+    assert cache.get("a1") is None
+    assert [s["asset_id"] for s in cache.list(regions=["r1"])] == ["a3"]
+    assert cache.list(regions=["r1"], region_id="r2") == []
+    assert [s["asset_id"] for s in cache.list()] == ["a3", "a2"]
+
+
+def test_state_cache_ttl_expiry():
+    cache = LatestStateCache(ttl_seconds=60)
+    cache.update(_point("a1", "2024-01-01T00:00:00Z", region_id="r1"))
+    assert cache.evict_expired() == 0
+    cache.ttl_seconds = -1
+    assert cache.list() == []
+    assert cache.evict_expired() == 1
+    assert len(cache) == 0
+
+
+def test_grid_index_matches_brute_force():
+    import math
+    import random
+
+    from spatial_index import GridIndex
+
+    rng = random.Random(7)
+    index = GridIndex(cell_size=50.0)
+    positions = {}
+    for i in range(500):
+        positions[f"a{i}"] = (rng.uniform(-1000, 1000), rng.uniform(-1000, 1000))
+        index.update(f"a{i}", *positions[f"a{i}"])
+    for i in range(0, 500, 5):
+        positions[f"a{i}"] = (rng.uniform(-1000, 1000), rng.uniform(-1000, 1000))
+        index.update(f"a{i}", *positions[f"a{i}"])
+    index.remove("a1")
+    del positions["a1"]
+
+    def dist(aid):
+        return math.hypot(positions[aid][0] - 10, positions[aid][1] + 20)
+
+    assert len(index) == len(positions)
+    assert [h[0] for h in index.radius(10, -20, 300)] == sorted((a for a in positions if dist(a) <= 300), key=dist)
+    assert [h[0] for h in index.nearest(10, -20, 7)] == sorted(positions, key=dist)[:7]
+    inside = {a for a, (x, y) in positions.items() if -100 <= x <= 250 and 0 <= y <= 400}
+    assert {h[0] for h in index.bbox(-100, 0, 250, 400)} == inside
+
+
+def test_state_eviction_removes_from_spatial_index():
+    from spatial_index import GridIndex
+
+    index = GridIndex()
+    cache = LatestStateCache(max_assets=1, on_evict=index.remove)
+    cache.update(_point("a1", "2024-01-01T00:00:00Z", position=[0, 0]))
+    index.update("a1", 0, 0)
+    cache.update(_point("a2", "2024-01-01T00:00:00Z", position=[1, 1]))
+    assert len(index) == 0
+
+
+def test_bucket_accumulator_vectorized_stats():
+    import numpy as np
+
+    from defense_shared.telemetry_stats import BucketAccumulator
+
+    acc = BucketAccumulator()
+    speeds = [1.0, 4.0, 2.5, 7.0]
+    for i, v in enumerate(speeds):
+        payload = {"speed": v, "position": [i, 0, 100 + i], "status": "in_mission", "armed": True}
+        if i == 3:
+            payload.pop("position")
+        acc.add(ASSET_1, f"2024-01-01T00:00:{10 + i}Z", "simulator", payload)
+    acc.add(ASSET_1, "2024-01-01T00:01:00Z", "simulator", {"speed": 9.0})
+    assert not acc.add(ASSET_1, "not-a-time", "simulator", {})
+    assert not acc.add("a1", "2024-01-01T00:01:00Z", "simulator", {})
+
+    rows = sorted(acc.drain(), key=lambda r: r["bucket_ts"])
+    assert len(acc) == 0
+    assert [r["count_events"] for r in rows] == [4, 1]
+    stats = rows[0]["stats"]
+    assert set(stats) == {"speed", "position.x", "position.y", "position.z"}
+    assert stats["speed"]["n"] == 4
+    assert stats["speed"]["min"] == 1.0 and stats["speed"]["max"] == 7.0
+    assert np.isclose(stats["speed"]["mean"], np.mean(speeds))
+    assert np.isclose(stats["speed"]["std"], np.std(speeds))
+    assert stats["position.z"] == {"n": 3, "min": 100.0, "max": 102.0, "mean": 101.0, "std": np.std([100, 101, 102])}
+
+
+class _FakeFuture:
+    """kafka-python's FutureRecordMetadata surface used by the publisher."""
+
+    def __init__(self, error=None, done=True):
+        self.is_done = done
+        self.exception = error
+
+    def failed(self):
+        return self.exception is not None
+
+
+class _FakeProducer:
+    def __init__(self, outcomes=None):
+        self.sent = []
+        self.outcomes = outcomes or {}  # asset_id -> _FakeFuture
+        self.flushes = []
+
+    def send(self, topic, key=None, value=None):
+        self.sent.append((topic, key, value))
+        return self.outcomes.get(key, _FakeFuture())
+
+    def flush(self, timeout=None):
+        self.flushes.append(timeout)
+
+
+def test_aggregator_counts_each_event_once_under_replay():
+    import json
+    from defense_shared.dedup import RotatingBloomFilter
+    from defense_shared.telemetry_stats import BucketAccumulator
+
+    messages = [
+        json.dumps(_point(f"00000000-0000-0000-0000-00000000000{i % 3}", f"2024-01-01T00:00:{i:02d}Z", speed=float(i))).encode()
+        for i in range(30)
+    ]
+    acc = BucketAccumulator()
+    dedup = RotatingBloomFilter(capacity=1000, error_rate=1e-6, window_seconds=3600)
+    # Redelivery after a rebalance: the whole batch, then an overlapping tail, arrives again.
+    outcomes = [telemetry_aggregator.handle_message(acc, dedup, m) for m in messages + messages + messages[20:]]
+    assert outcomes.count("added") == 30
+    assert outcomes.count("duplicate") == 40
+    rows = acc.drain()
+    assert sum(r["count_events"] for r in rows) == 30
+    assert all(r["stats"]["speed"]["n"] == 10 for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_aggregator_drops_non_uuid_asset_ids_so_the_batch_still_flushes():
+    import json
+    import uuid
+    from defense_shared.dedup import RotatingBloomFilter
+    from defense_shared.telemetry_stats import BucketAccumulator
+
+    class _Conn:
+        def __init__(self):
+            self.rows = []
+
+        def transaction(self):
+            return self
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def executemany(self, sql, args):
+            for a in args:
+                uuid.UUID(a[0])  # what the ::uuid cast does to the whole statement
+            self.rows += args
+
+    class _Pool:
+        def __init__(self):
+            self.conn = _Conn()
+
+        def acquire(self):
+            return self.conn
+
+    acc = BucketAccumulator()
+    dedup = RotatingBloomFilter(capacity=1000, error_rate=1e-6, window_seconds=3600)
+    before = telemetry_aggregator._metrics["telemetry_aggregator_invalid_asset_id_total"]
+    batch = [_point(ASSET_1, "2024-01-01T00:00:01Z", speed=1.0), _point("a1", "2024-01-01T00:00:02Z", speed=2.0),
+             _point(ASSET_1.upper(), "2024-01-01T00:00:03Z", speed=3.0)]
+    outcomes = [telemetry_aggregator.handle_message(acc, dedup, json.dumps(p).encode()) for p in batch]
+    assert outcomes == ["added", "invalid", "added"]
+    assert telemetry_aggregator._metrics["telemetry_aggregator_invalid_asset_id_total"] == before + 1
+    pool = _Pool()
+    assert await telemetry_aggregator.flush(pool, acc) == 1
+    assert pool.conn.rows[0][0] == ASSET_1 and pool.conn.rows[0][3] == 2
+
+
+def test_rotating_bloom_filter_forgets_after_window_and_stays_bounded():
+    from defense_shared.dedup import RotatingBloomFilter
+
+    f = RotatingBloomFilter(capacity=100, error_rate=1e-3, window_seconds=10, generations=2)
+    size = f.memory_bytes
+    assert not f.seen_or_add("k", now=f._started)
+    assert f.seen_or_add("k", now=f._started + 11)  # one rotation: still in the older generation
+    assert not f.seen_or_add("k", now=f._started + 22)  # two rotations: forgotten
+    for i in range(1000):
+        f.seen_or_add(f"x{i}", now=f._started)
+    assert f.memory_bytes == size
+
+
+def test_downsample_keeps_spikes_and_bounds_each_series():
+    from datetime import datetime, timedelta, timezone
+
+    import numpy as np
+    from downsample import lttb_indices
+
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 200.0)
+    y[4321] = 50.0
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200 and idx[0] == 0 and idx[-1] == 9_999
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {"id": i * 2 + k, "asset_id": asset, "source": "kafka", "bucket_ts": t0 + timedelta(minutes=i),
+         "count_events": 100 if i == 77 else 5, "stats": None}
+        for i in range(500)
+        for k, asset in enumerate(("a1", "a2"))
+    ]
+    rows.sort(key=lambda r: (r["bucket_ts"], r["id"]), reverse=True)
+    sampled = telemetry_main._downsample(rows, 50, None)
+    assert len(sampled) == 100
+    assert sum(r["count_events"] == 100 for r in sampled) == 2
+    assert sampled == sorted(sampled, key=lambda r: (r["bucket_ts"], r["id"]), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_ingest_batch_publishes_valid_points_with_per_item_results(monkeypatch):
+    fake = _FakeProducer()
+    monkeypatch.setattr(telemetry_main, "producer", fake)
+    good = json.dumps({"asset_id": ASSET_1, "timestamp": "2024-01-01T00:00:00Z", "source": "edge", "payload": {"speed": 3}})
+    body = "\n".join([
+        good, json.dumps({"asset_id": ASSET_1}), "not json", good.replace("2024-01-01T00:00:00Z", "yesterday"),
+        good.replace(ASSET_1, "a1"),
+    ])
+    async with AsyncClient(transport=ASGITransport(app=telemetry_main.app), base_url="http://test") as client:
+        r = await client.post("/ingest/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+        assert r.status_code == 200
+        data = r.json()
+        assert (data["accepted"], data["rejected"]) == (1, 4)
+        assert [x["ok"] for x in data["results"]] == [True, False, False, False, False]
+        assert data["results"][4]["error"] == "asset_id: not a UUID"
+        assert fake.sent == [("telemetry.raw", ASSET_1, {"asset_id": ASSET_1, "timestamp": "2024-01-01T00:00:00Z", "source": "edge", "payload": {"speed": 3}})]
+
+        assert fake.flushes == [telemetry_main.INGEST_ACK_TIMEOUT_SEC]
+
+        r = await client.post("/ingest/batch", json={"points": "nope"})
+        assert r.status_code == 400
+
+    # Points the broker rejected or did not ack in time are reported per item, not as accepted.
+    lost, slow = "5f0c6d1e-8b7a-4c3d-9e2f-000000000002", "5f0c6d1e-8b7a-4c3d-9e2f-000000000003"
+    fake = _FakeProducer({lost: _FakeFuture(error=TimeoutError()), slow: _FakeFuture(done=False)})
+    monkeypatch.setattr(telemetry_main, "producer", fake)
+    points = [json.loads(good), {**json.loads(good), "asset_id": lost}, {**json.loads(good), "asset_id": slow}]
+    async with AsyncClient(transport=ASGITransport(app=telemetry_main.app), base_url="http://test") as client:
+        data = (await client.post("/ingest/batch", json=points)).json()
+    assert (data["accepted"], data["rejected"]) == (1, 2)
+    assert data["results"][1] == {"index": 1, "ok": False, "error": "rejected by the broker: TimeoutError"}
+    assert data["results"][2] == {"index": 2, "ok": False, "error": "not acknowledged by the broker in time"}
+
+
+@pytest.mark.asyncio
+async def test_arrow_export_of_an_empty_range_is_a_valid_stream(monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+
+    class _Cursor:
+        async def fetch(self, n):
+            return []
+
+    class _Conn:
+        def transaction(self):
+            return self
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def cursor(self, q, *args):
+            return _Cursor()
+
+    class _Pool:
+        def acquire(self):
+            return _Conn()
+
+    async def get_pool():
+        return _Pool()
+
+    monkeypatch.setattr(telemetry_main, "get_pool", get_pool)
+    body = b"".join([chunk async for chunk in telemetry_main._stream_export("SELECT 1", [], "arrow")])
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.num_rows == 0
+    assert table.schema.names[:3] == ["id", "asset_id", "bucket_ts"]
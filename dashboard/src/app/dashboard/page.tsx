@@ -1,19 +1,25 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { listAssets, listAlerts, type Asset, type Alert } from "@/lib/api";
+import { getOverview, type Asset, type Alert } from "@/lib/api";
 
 export default function DashboardMapPage() {
   const [assets, setAssets] = useState<Asset[]>([]);
   const [alerts, setAlerts] = useState<Alert[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const [unavailable, setUnavailable] = useState<string[]>([]);
 
   useEffect(() => {
-    Promise.all([listAssets(), listAlerts({ limit: 20 })])
-      .then(([a, b]) => {
-        setAssets(a.items);
-        setAlerts(b.items);
+    getOverview({ alerts_limit: 20 })
+      .then(({ sections }) => {
+        if (sections.assets.status === "ok") setAssets(sections.assets.data.items);
+        if (sections.alerts.status === "ok") setAlerts(sections.alerts.data.items);
+        setUnavailable(
+          Object.entries(sections)
+            .filter(([, s]) => s.status !== "ok")
+            .map(([name]) => name)
+        );
       })
       .catch((e) => setError(e.message))
       .finally(() => setLoading(false));
@@ -29,6 +35,9 @@ export default function DashboardMapPage() {
         Placeholder for real-time telemetry map: asset positions, threat overlays, path planning.
         Connect to WebSocket or polling endpoint for live updates.
       </p>
+      {unavailable.length > 0 && (
+        <p style={{ color: "#d29922" }}>Temporarily unavailable: {unavailable.join(", ")}</p>
+      )}
       <section style={{ marginTop: "1rem", display: "grid", gridTemplateColumns: "1fr 1fr", gap: "1rem" }}>
         <div>
           <h2>Assets ({assets.length})</h2>
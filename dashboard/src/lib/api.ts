@@ -36,20 +36,96 @@ export async function getTelemetry(params: {
   from_ts?: string;
   to_ts?: string;
   limit?: number;
+  cursor?: string;
+  fields?: string;
+  /** Downsample each series to at most this many points (LTTB); disables cursor paging. */
+  max_points?: number;
 }) {
   const q = new URLSearchParams(
     Object.fromEntries(
       Object.entries(params).filter(([, v]) => v != null) as [string, string][]
     )
   ).toString();
-  return api<{ items: TelemetryPoint[]; total: number }>(
+  return api<{ items: TelemetryPoint[]; total: number; next_cursor: string | null }>(
     `/api/v1/telemetry/aggregated${q ? `?${q}` : ""}`
   );
 }
 
-export async function listAlerts(params?: { region_id?: string; state?: string; limit?: number }) {
+export async function listAlerts(params?: { region_id?: string; state?: string; limit?: number; cursor?: string }) {
   const q = new URLSearchParams(params as Record<string, string>).toString();
-  return api<{ items: Alert[]; total: number }>(`/api/v1/alerts${q ? `?${q}` : ""}`);
+  return api<{ items: Alert[]; total: number; next_cursor: string | null }>(`/api/v1/alerts${q ? `?${q}` : ""}`);
+}
+
+export async function getAlertSummary(params?: { region_id?: string }) {
+  const q = new URLSearchParams(params as Record<string, string>).toString();
+  return api<AlertSummary>(`/api/v1/alerts/summary${q ? `?${q}` : ""}`);
+}
+
+/**
+ * Dashboard home in one request: sections are fetched concurrently by the gateway under one deadline.
+ * A section that failed or timed out has no data; the others are still returned (partial = true).
+ */
+export async function getOverview(params?: { region_id?: string; alerts_limit?: number }) {
+  const q = new URLSearchParams(params as Record<string, string>).toString();
+  return api<Overview>(`/api/v1/overview${q ? `?${q}` : ""}`);
+}
+
+/** Acknowledge, resolve or escalate alerts by id or by filter (exactly one of ids / filter). */
+export async function bulkUpdateAlerts(body: {
+  action: "acknowledge" | "resolve" | "escalate";
+  ids?: string[];
+  filter?: {
+    region_id?: string;
+    class_name?: string;
+    severity?: string;
+    state?: string;
+    created_from?: string;
+    created_to?: string;
+  };
+}) {
+  return api<{ action: string; state: string; updated: number; skipped?: number; chunks: number }>(
+    "/api/v1/alerts/bulk",
+    { method: "POST", body: JSON.stringify(body) }
+  );
+}
+
+/**
+ * Subscribe to alert changes (server-sent events). Uses fetch streaming rather than EventSource so the
+ * Bearer token can be sent. Resolves when the stream ends (server restart or client too slow); callers
+ * should re-sync with listAlerts and subscribe again. Abort via signal to stop.
+ */
+export async function streamAlerts(
+  params: { region_id?: string; severity?: string },
+  onEvent: (event: AlertEvent) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const q = new URLSearchParams(
+    Object.fromEntries(Object.entries(params).filter(([, v]) => v != null) as [string, string][])
+  ).toString();
+  const token = getToken();
+  const res = await fetch(`${API_URL}/api/v1/alerts/stream${q ? `?${q}` : ""}`, {
+    headers: token ? { Authorization: `Bearer ${token}`, Accept: "text/event-stream" } : { Accept: "text/event-stream" },
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(await res.text().catch(() => res.statusText));
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buf += value;
+    let sep: number;
+    while ((sep = buf.indexOf("\n\n")) >= 0) {
+      const frame = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      const data = frame
+        .split("\n")
+        .filter((l) => l.startsWith("data:"))
+        .map((l) => l.slice(5).trim())
+        .join("\n");
+      if (data) onEvent(JSON.parse(data) as AlertEvent);
+    }
+  }
 }
 
 export async function emergencyStop(body: { asset_id?: string }) {
@@ -109,3 +185,41 @@ export type Alert = {
   created_at: string;
   updated_at: string;
 };
+
+export type AlertEvent = {
+  op: "insert" | "update";
+  id: string;
+  source: string;
+  severity: string;
+  title: string;
+  asset_id: string | null;
+  region_id: string | null;
+  detection_id: string | null;
+  state: string;
+  hit_count: number;
+  last_seen: string | null;
+  created_at: string;
+  updated_at: string;
+};
+
+export type AlertSummary = {
+  total: number;
+  by_severity: Record<string, number>;
+  by_state: Record<string, number>;
+  by_region: Record<string, number>;
+  new_by_severity: Record<string, number>;
+};
+
+export type OverviewSection<T> =
+  | { status: "ok"; data: T; ms: number }
+  | { status: "timeout" | "error"; detail: string; ms: number };
+
+export type Overview = {
+  sections: {
+    assets: OverviewSection<{ items: Asset[]; total: number }>;
+    alerts: OverviewSection<{ items: Alert[]; total: number; next_cursor: string | null }>;
+    alert_summary: OverviewSection<AlertSummary>;
+    telemetry_state: OverviewSection<{ items: Record<string, unknown>[]; total: number }>;
+  };
+  partial: boolean;
+};
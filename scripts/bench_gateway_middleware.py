@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Throughput of the gateway middleware stack (security headers + rate limit) around a trivial JSON
+route, driven in-process over raw ASGI so only middleware cost is measured: the previous
+BaseHTTPMiddleware classes (reproduced below) versus the pure-ASGI ones in api_gateway/middleware.py.
+Usage: python scripts/bench_gateway_middleware.py [REQUESTS] [CONCURRENCY]
+"""
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "backend", "services", "api_gateway"), os.path.join(ROOT, "backend", "shared")]
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse, Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+import middleware  # noqa: E402
+from defense_shared.security import security_headers  # noqa: E402
+
+LIMIT = 10 ** 9
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for k, v in security_headers().items():
+            response.headers[k] = v
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app, max_requests=LIMIT):
+        super().__init__(app)
+        self.max_requests = max_requests
+        self.store = {}
+
+    async def dispatch(self, request, call_next):
+        key = request.headers.get("X-Forwarded-For") or (request.client.host if request.client else "unknown")
+        count, start = self.store.get(key, (0, 0.0))
+        now = time.time()
+        if now - start > 60:
+            count, start = 0, now
+        count += 1
+        self.store[key] = (count, start)
+        if count > self.max_requests:
+            return Response(status_code=429, content="Too Many Requests")
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(self.max_requests)
+        response.headers["X-RateLimit-Remaining"] = str(max(0, self.max_requests - count))
+        return response
+
+
+async def assets(request):
+    return JSONResponse({"items": [], "total": 0})
+
+
+def build(stack):
+    return Starlette(routes=[Route("/api/v1/assets", assets)], middleware=[Middleware(cls, **kw) for cls, kw in stack])
+
+
+async def drive(app, n, concurrency):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/v1/assets", "raw_path": b"/api/v1/assets", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("10.0.0.1", 5000), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def worker(count):
+        for _ in range(count):
+            await app(dict(scope), receive, send)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+    return (n // concurrency * concurrency) / (time.perf_counter() - t0)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    stacks = {
+        "no middleware": [],
+        "BaseHTTPMiddleware": [(LegacyRateLimit, {}), (LegacySecurityHeaders, {})],
+        "pure ASGI": [(middleware.RateLimitMiddleware, {"max_requests": LIMIT}), (middleware.SecurityHeadersMiddleware, {})],
+    }
+    for name, stack in stacks.items():
+        app = build(list(reversed(stack)))  # Starlette applies the first entry outermost
+        asyncio.run(drive(app, 1000, concurrency))
+        rate = asyncio.run(drive(app, n, concurrency))
+        print(f"{name:>20}: {rate:,.0f} req/s  ({1e6 / rate:.1f} us/req, c={concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark gateway latency under concurrency with a fresh httpx.AsyncClient per proxied request (the
+old gateway behaviour) versus the shared pooled upstream clients (api_gateway/upstream.py).
+Starts a stub asset service and the real gateway app with uvicorn in subprocesses, then sends N
+GET /api/v1/assets requests with C in flight and reports throughput and p50/p99 latency.
+Usage: python scripts/bench_gateway_upstream.py [N] [CONCURRENCY]
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GATEWAY_DIR = os.path.join(ROOT, "backend", "services", "api_gateway")
+SHARED_DIR = os.path.join(ROOT, "backend", "shared")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_upstream(port):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def assets(request):
+        return JSONResponse({"items": [{"id": str(i), "name": f"asset-{i}"} for i in range(20)], "total": 20})
+
+    uvicorn.run(Starlette(routes=[Route("/assets", assets)]), host="127.0.0.1", port=port, log_level="warning")
+
+
+class _PerRequestClient:
+    """The pre-pool behaviour: a new client (and connection) for every request."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    async def get(self, path, **kwargs):
+        import httpx
+
+        async with httpx.AsyncClient(base_url=self.base_url) as client:
+            return await client.get(path, **kwargs)
+
+
+def serve_gateway(port, mode):
+    sys.path[:0] = [GATEWAY_DIR, SHARED_DIR]
+    import uvicorn
+    import main
+
+    if mode == "per-request":
+        main.upstream.get = lambda service, stream=False: _PerRequestClient(main.SERVICE_URLS[service])
+    # The rate limiter would reject a benchmark's worth of requests from one address.
+    import middleware
+    from rate_limit import RateLimiter
+
+    for m in main.app.user_middleware:
+        if m.cls is middleware.RateLimitMiddleware:
+            m.kwargs["limiter"] = RateLimiter(ip_max=10 ** 9, user_max=10 ** 9, route_limits={})
+    # Failed upstream calls surface as 500s and are counted; their tracebacks would only drown the output.
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="critical")
+
+
+async def wait_ready(url):
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def load(url, n, concurrency):
+    import httpx
+
+    latencies = []
+    errors = 0
+    queue = iter(range(n))
+    headers = {"Authorization": "Bearer dev-token"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                t0 = time.perf_counter()
+                r = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                errors += r.status_code != 200
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1], errors
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--upstream":
+        return serve_upstream(int(sys.argv[2]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--gateway":
+        return serve_gateway(int(sys.argv[2]), sys.argv[3])
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    upstream_port = free_port()
+    procs = [subprocess.Popen([sys.executable, __file__, "--upstream", str(upstream_port)])]
+    env = {**os.environ, "ALLOW_DEV_TOKEN": "true", "ASSET_SERVICE_URL": f"http://127.0.0.1:{upstream_port}"}
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{upstream_port}/assets"))
+        for mode in ("per-request", "pooled"):
+            port = free_port()
+            gw = subprocess.Popen([sys.executable, __file__, "--gateway", str(port), mode], env=env)
+            procs.append(gw)
+            url = f"http://127.0.0.1:{port}/api/v1/assets"
+            asyncio.run(wait_ready(f"http://127.0.0.1:{port}/health"))
+            asyncio.run(load(url, min(n, 200), concurrency))  # warm-up
+            elapsed, p50, p99, errors = asyncio.run(load(url, n, concurrency))
+            print(
+                f"{mode:>12}: {n / elapsed:,.0f} req/s  p50 {p50 * 1000:.1f} ms  p99 {p99 * 1000:.1f} ms  "
+                f"errors {errors}  (c={concurrency})"
+            )
+            gw.terminate()
+            gw.wait()
+    finally:
+        for p in procs:
+            p.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the gateway auth dependency (get_current_user) for one token presented repeatedly,
+as a dashboard does: full signature and claim verification on every call versus the verified-token
+cache in defense_shared.security.decode_jwt.
+Usage: python scripts/bench_jwt_auth.py [CALLS]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "backend", "services", "api_gateway"), os.path.join(ROOT, "backend", "shared")]
+os.environ.setdefault("JWT_SECRET", "bench_secret_for_jwt_cache_microbenchmark")
+
+import jwt  # noqa: E402
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+from defense_shared import security  # noqa: E402
+from main import get_current_user  # noqa: E402
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    token = jwt.encode(
+        {"sub": "bench-user", "role": "local_operator", "region_ids": ["north", "east"],
+         "iss": security.JWT_ISSUER, "aud": security.JWT_AUDIENCE, "exp": int(time.time()) + 3600},
+        security.JWT_SECRET,
+        algorithm=security.JWT_ALGORITHM,
+    )
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    cache_size = security.JWT_CACHE_SIZE
+    for name, size in (("verify every call", 0), ("verified-token cache", cache_size)):
+        security.JWT_CACHE_SIZE = size
+        security.clear_jwt_cache()
+        get_current_user(creds)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            get_current_user(creds)
+        dt = time.perf_counter() - t0
+        print(f"{name:>22}: {dt / n * 1e6:6.2f} us/call  ({n / dt:,.0f} calls/s)")
+
+
+if __name__ == "__main__":
+    main()